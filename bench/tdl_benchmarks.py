@@ -0,0 +1,44 @@
+
+from __future__ import print_function
+import os
+import io
+import timeit
+import tempfile
+import shutil
+
+from delphin import tdl
+
+# a generated lexicon of 100k entries in the style of the ERG's lexicon.tdl
+N = 100000
+entry = u'''\
+{0}_n1 := n_-_c_le & ; common noun
+  [ ORTH < "{0}" >,
+    SYNSEM [ LKEYS.KEYREL.PRED "_{0}_n_1_rel",
+             PHON.ONSET con ] ].
+
+'''
+fd, path = tempfile.mkstemp(suffix='.tdl')
+os.close(fd)
+with io.open(path, 'w', encoding='utf-8') as f:
+    f.write(u';;; generated lexicon\n\n')
+    for i in range(N):
+        f.write(entry.format('word{}'.format(i)))
+
+cache = tempfile.mkdtemp()
+try:
+    print('tdl.iterparse ({} entries)'.format(N).ljust(50), end='')
+    print(timeit.timeit(
+        'for _ in tdl.iterparse(path): pass',
+        setup='from __main__ import tdl, path',
+        number=1
+    ))
+    list(tdl.load_grammar(path, jobs=1, cache=cache))
+    print('tdl.load_grammar (cached)'.ljust(50), end='')
+    print(timeit.timeit(
+        'for _ in tdl.load_grammar(path, jobs=1, cache=cache): pass',
+        setup='from __main__ import tdl, path, cache',
+        number=1
+    ))
+finally:
+    os.remove(path)
+    shutil.rmtree(cache)
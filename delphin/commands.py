@@ -12,11 +12,12 @@ import sys
 import os
 import io
 import json
+import multiprocessing
 from functools import partial
 
 from delphin import itsdb, tsql
 from delphin.mrs import xmrs
-from delphin.util import safe_int, SExpr
+from delphin.util import safe_int, SExpr, stringtypes
 
 
 ###############################################################################
@@ -66,15 +67,17 @@ def convert(path, source_fmt, target_fmt, select='result:mrs',
     # read
     loads = _get_codec(source_fmt)
     if path is None:
-        xs = loads(sys.stdin.read())
+        xs = _read_stream(sys.stdin, source_fmt, loads)
     elif hasattr(path, 'read'):
-        xs = loads(path.read())
+        xs = _read_stream(path, source_fmt, loads)
     elif os.path.isdir(path):
         ts = itsdb.TestSuite(path)
         xs = [
             next(iter(loads(r[0])), None)
             for r in tsql.select(select, ts)
         ]
+    elif source_fmt == 'simplemrs':
+        xs = _read_stream(path, source_fmt, loads)
     else:
         xs = loads(open(path, 'r').read())
 
@@ -94,6 +97,16 @@ def convert(path, source_fmt, target_fmt, select='result:mrs',
     return dumps(xs, **kwargs)
 
 
+def _read_stream(fh, codec, loads):
+    # SimpleMRS files are read incrementally; anything else (including
+    # objects with read() that are not files) is read all at once
+    if codec == 'simplemrs' and (isinstance(fh, stringtypes)
+                                 or hasattr(fh, 'readline')):
+        from delphin.mrs import simplemrs
+        return simplemrs.iterload(fh)
+    return loads(fh.read())
+
+
 def _get_codec(codec, load=True):
     if codec == 'simplemrs':
         from delphin.mrs import simplemrs
@@ -247,27 +260,54 @@ def _read_ace_parse(s):
 ###############################################################################
 ### SELECT ####################################################################
 
-def select(dataspec, testsuite, mode='list', cast=True):
+def select(dataspec, testsuite, mode='list', cast=True, explain=False,
+           jobs=None):
     """
     Select data from [incr tsdb()] profiles.
 
+    If *testsuite* is a glob pattern (e.g., `"tsdb/gold/*"`), a list
+    of paths or patterns, or a
+    :class:`~delphin.itsdb.ProfileCollection`, the query is performed
+    on every matched testsuite in parallel and each result is prefixed
+    with the path of the testsuite it came from (see
+    :func:`delphin.tsql.select`).
+
     Args:
         query (str): TSQL select query (e.g., `'i-id i-input mrs'` or
             `'* from item where readings > 0'`)
-        testsuite (str, TestSuite): testsuite or path to testsuite
-            containing data to select
+        testsuite (str, list, TestSuite, ProfileCollection):
+            testsuite, path to testsuite, or glob pattern or list of
+            paths of testsuites containing data to select
         mode (str): see :func:`delphin.itsdb.select_rows` for a
             description of the *mode* parameter (default: `list`)
         cast (bool): if `True`, cast column values to their datatype
             according to the relations file (default: `True`)
+        explain (bool): if `True`, evaluate the query and return the
+            stages of its evaluation (see :func:`delphin.tsql.explain`)
+            instead of the selected data (default: `False`)
+        jobs (int): number of processes used when selecting from
+            multiple testsuites; if `None`, use the number of CPUs
+            (default: `None`)
     Returns:
-        a generator that yields selected data
+        a generator that yields selected data, or a list of query
+        stages if *explain* is `True`
     """
     if isinstance(testsuite, itsdb.ItsdbProfile):
         testsuite = itsdb.TestSuite(testsuite.root)
-    elif not isinstance(testsuite, itsdb.TestSuite):
+    elif isinstance(testsuite, (itsdb.TestSuite, itsdb.ProfileCollection)):
+        pass
+    elif (not isinstance(testsuite, stringtypes)
+          or not os.path.isdir(testsuite)):
+        testsuite = itsdb.ProfileCollection(testsuite)
+        if len(testsuite) == 0:
+            raise itsdb.ItsdbError('no testsuites found')
+    else:
         testsuite = itsdb.TestSuite(testsuite)
-    return tsql.select(dataspec, testsuite, mode=mode, cast=cast)
+    if explain:
+        if isinstance(testsuite, itsdb.ProfileCollection):
+            raise ValueError("'explain' requires a single testsuite")
+        return tsql.explain('select ' + dataspec, testsuite, cast=cast)
+    return tsql.select(dataspec, testsuite, mode=mode, cast=cast, jobs=jobs)
 
 
 ###############################################################################
@@ -559,7 +599,7 @@ def _repp(r, line, format, trace_level):
 ###############################################################################
 ### COMPARE ###################################################################
 
-def compare(testsuite, gold, select='i-id i-input mrs'):
+def compare(testsuite, gold, select='i-id i-input mrs', jobs=1):
     """
     Compare two [incr tsdb()] profiles.
 
@@ -570,6 +610,9 @@ def compare(testsuite, gold, select='i-id i-input mrs'):
             testsuite or a :class:`TestSuite` object
         select: TSQL query to select (id, input, mrs) triples
             (default: `i-id i-input mrs`)
+        jobs (int): number of worker processes used to decode and
+            compare items, or `None` for the number of CPUs; results
+            are yielded in item order (default: `1`)
     Yields:
         dict: Comparison results as::
 
@@ -580,8 +623,6 @@ def compare(testsuite, gold, select='i-id i-input mrs'):
              "gold": number_of_unique_results_in_gold}
 
     """
-    from delphin.mrs import simplemrs, compare as mrs_compare
-
     if not isinstance(testsuite, itsdb.TestSuite):
         if isinstance(testsuite, itsdb.ItsdbProfile):
             testsuite = testsuite.root
@@ -604,15 +645,41 @@ def compare(testsuite, gold, select='i-id i-input mrs'):
         tsql.select(select, gold),
         0)
 
-    for (key, testrows, goldrows) in matched_rows:
-        (test_unique, shared, gold_unique) = mrs_compare.compare_bags(
-            [simplemrs.loads_one(row[2]) for row in testrows],
-            [simplemrs.loads_one(row[2]) for row in goldrows])
-        yield {'id': key,
-               'input': i_inputs[key],
-               'test': test_unique,
-               'shared': shared,
-               'gold': gold_unique}
+    # workers get the raw MRS strings so decoding is parallelized, too
+    args = [(key,
+             [row[2] for row in testrows],
+             [row[2] for row in goldrows])
+            for key, testrows, goldrows in matched_rows]
+    if jobs == 1 or len(args) <= 1:
+        results = (_compare_item(arg) for arg in args)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs)
+        # send items in batches, as most are quick to compare
+        processes = jobs or multiprocessing.cpu_count()
+        chunksize = max(1, min(64, len(args) // (processes * 4)))
+        results = pool.imap(_compare_item, args, chunksize)
+    try:
+        for key, (test_unique, shared, gold_unique) in results:
+            yield {'id': key,
+                   'input': i_inputs[key],
+                   'test': test_unique,
+                   'shared': shared,
+                   'gold': gold_unique}
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def _compare_item(args):
+    # top-level function so it can be sent to worker processes
+    from delphin.mrs import simplemrs, compare as mrs_compare
+    key, test_mrss, gold_mrss = args
+    counts = mrs_compare.compare_bags(
+        [simplemrs.loads_one(s) for s in test_mrss],
+        [simplemrs.loads_one(s) for s in gold_mrss])
+    return key, counts
 
 
 ###############################################################################
@@ -85,11 +85,22 @@ class TdlWarning(PyDelphinWarning):
     pass
 
 
+class UnificationError(PyDelphinException):
+    """Raised when a feature structure is not consistent."""
+    pass
+
+
 class REPPError(PyDelphinException):
     """Raised when there is an error in tokenizing with REPP."""
     pass
 
-class TSQLSyntaxError(PyDelphinException):
+
+class TSQLError(PyDelphinException):
+    """Raised when there is an error in processing a TSQL query."""
+    pass
+
+
+class TSQLSyntaxError(TSQLError):
     def __init__(self, *args, **kwargs):
         # Python2 doesn't allow parameters like:
         #   (*args, key=val, **kwargs)
@@ -80,6 +80,9 @@ except NameError:
 
 import os
 import re
+import glob
+import shutil
+import tempfile
 from gzip import GzipFile
 import logging
 import io
@@ -88,12 +91,13 @@ from collections import (
     defaultdict, namedtuple, OrderedDict, Sequence, Mapping
 )
 from itertools import chain
+from bisect import bisect_left, bisect_right
 from contextlib import contextmanager
 
 
 from delphin.exceptions import ItsdbError
 from delphin.util import (
-    safe_int, stringtypes, deprecated, parse_datetime
+    safe_int, stringtypes, deprecated, parse_datetime, replace_file
 )
 from delphin.interfaces.base import FieldMapper
 
@@ -105,6 +109,12 @@ _field_delimiter = '@'
 _default_datatype_values = {
     ':integer': '-1'
 }
+_datatype_casts = {
+    ':integer': int,
+    ':float': float,
+    ':date': parse_datetime
+}
+_index_suffix = '.idx'
 tsdb_coded_attributes = {
     'i-wf': 1,
     'i-difficulty': 1,
@@ -454,6 +464,10 @@ class Record(list):
         fields (:class:`Relation`): table schema
     """
 
+    # the Table containing the record, which is marked as modified
+    # when the record is changed
+    _table = None
+
     def __init__(self, fields, iterable):
         # normalize data format
         if isinstance(iterable, Mapping):
@@ -505,6 +519,8 @@ class Record(list):
         if not isinstance(index, int):
             index = self.fields.index(index)
         # should the value be validated against the datatype?
+        if self._table is not None:
+            self._table.modified = True
         return list.__setitem__(self, index, value)
 
     def get(self, key, default=None, cast=False):
@@ -554,6 +570,8 @@ class Table(list):
     Attributes:
         name (str): table name
         fields (:class:`Relation`): table schema
+        modified (bool): `False` if the table is known to be the same
+            as the table file on disk, otherwise `True`
     """
 
     def __init__(self, name, fields, records=None):
@@ -563,7 +581,11 @@ class Table(list):
         if records is None:
             records = []
         # ensure records are Record objects
-        list.__init__(self, [Record(fields, rec) for rec in records])
+        records = [Record(fields, rec) for rec in records]
+        for record in records:
+            record._table = self
+        list.__init__(self, records)
+        self.modified = True
 
     @classmethod
     def from_file(cls, path, name=None, fields=None, encoding='utf-8'):
@@ -601,7 +623,9 @@ class Table(list):
         with _open_table(path, encoding) as tab:
             records.extend(map((lambda s: decode_row(s)), tab))
 
-        return cls(name, fields, records)
+        table = cls(name, fields, records)
+        table.modified = False
+        return table
 
     def select(self, cols, mode='list'):
         """
@@ -621,6 +645,206 @@ class Table(list):
         return select_rows(cols, self, mode=mode)
 
 
+def _modifies_table(method):
+    def modify(self, *args):
+        self.modified = True
+        return method(self, *args)
+    modify.__name__ = method.__name__
+    modify.__doc__ = method.__doc__
+    return modify
+
+
+# mark tables as modified when their list of records is changed
+for _name in ('__setitem__', '__delitem__', '__setslice__', '__delslice__',
+              '__iadd__', '__imul__', 'append', 'extend', 'insert', 'pop',
+              'remove', 'reverse', 'sort', 'clear'):
+    if hasattr(list, _name):
+        setattr(Table, _name, _modifies_table(getattr(list, _name)))
+del _name
+
+
+class ColumnIndex(object):
+    """
+    A sorted index of the values of one column of a table.
+
+    The index maps each (cast) value in the column to the offsets
+    (0-based row numbers) of the records in the table file that have
+    that value, so records matching an equality or range condition
+    can be found without scanning the table. Indexes are stored in
+    files beside the tables they index (e.g., `item.i-id.idx`) and are
+    generally created and retrieved via
+    :meth:`TestSuite.create_index` and :meth:`TestSuite.get_index`.
+    Records whose value cannot be cast to the column's datatype are
+    not included in the index.
+
+    Args:
+        column: the name of the indexed column
+        datatype: the datatype of the indexed column
+        keys: the sorted, cast values of the column
+        rows: the row offsets corresponding to each value in *keys*
+        stat: the `(size, mtime)` of the table file when the index
+            was built
+        unique_keys: `True` if no two records of the table share the
+            values of the table's key fields
+    Attributes:
+        column (:py:class:`str`): name of the indexed column
+        datatype (:py:class:`str`): datatype of the indexed column
+        rowcount (int): the number of records in the indexed table
+        unique_keys (bool): `True` if the key fields of the table
+            identify its records
+    """
+
+    def __init__(self, column, datatype, keys, rows, rowcount,
+                 stat=None, unique_keys=False):
+        self.column = column
+        self.datatype = datatype
+        self.rowcount = rowcount
+        self.unique_keys = unique_keys
+        self._keys = list(keys)
+        self._rows = list(rows)
+        self._stat = stat
+
+    def __len__(self):
+        return len(self._keys)
+
+    @classmethod
+    def build(cls, path, fields, column, encoding='utf-8'):
+        """
+        Build an index of *column* from the table file at *path*.
+
+        Args:
+            path: the path to the table file
+            fields: the Relation schema of the table
+            column: the name of the column to index
+            encoding: the character encoding of the table file
+        """
+        path = _table_filename(path)
+        i = fields.index(column)
+        datatype = fields[i].datatype
+        cast = _datatype_casts.get(datatype, unicode)
+        keyidx = [fields.index(key) for key in fields.keys()]
+        seen = set()
+        unique = True
+        pairs = []
+        rowcount = 0
+        stat = _file_stat(path)
+        with _open_table(path, encoding) as tab:
+            for rowcount, line in enumerate(tab, 1):
+                cols = decode_row(line)
+                if unique:
+                    keyvals = tuple(cols[k] for k in keyidx)
+                    unique = keyvals not in seen
+                    seen.add(keyvals)
+                try:
+                    value = cast(cols[i])
+                except ValueError:
+                    continue
+                if value is not None:
+                    pairs.append((value, rowcount - 1))
+        pairs.sort()
+        return cls(column,
+                   datatype,
+                   [value for value, _ in pairs],
+                   [row for _, row in pairs],
+                   rowcount,
+                   stat=stat,
+                   unique_keys=unique)
+
+    @classmethod
+    def from_file(cls, path, encoding='utf-8'):
+        """
+        Load an index from the index file at *path*.
+        """
+        with io.open(path, encoding=encoding) as f:
+            header = decode_row(next(f))
+            column, datatype = header[0], header[1]
+            rowcount, size = int(header[2]), int(header[3])
+            mtime, unique = float(header[4]), header[5] == '1'
+            cast = _datatype_casts.get(datatype, unicode)
+            keys, rows = [], []
+            for line in f:
+                value, row = decode_row(line)
+                keys.append(cast(value))
+                rows.append(int(row))
+        return cls(column, datatype, keys, rows, rowcount,
+                   stat=(size, mtime), unique_keys=unique)
+
+    def write(self, path, encoding='utf-8'):
+        """
+        Write the index to the index file at *path*.
+        """
+        size, mtime = self._stat
+        header = [self.column, self.datatype, self.rowcount, size,
+                  repr(mtime), int(self.unique_keys)]
+        with io.open(path, 'w', encoding=encoding) as f:
+            f.write(encode_row(header) + '\n')
+            for value, row in zip(self._keys, self._rows):
+                f.write(encode_row([value, row]) + '\n')
+
+    def is_current(self, path):
+        """
+        Return `True` if the table file at *path* is unchanged since
+        the index was built.
+        """
+        return self._stat == _file_stat(path)
+
+    def lookup(self, op, value):
+        """
+        Return the offsets of the rows whose value satisfies a condition.
+
+        Args:
+            op: one of `"=="`, `"<"`, `"<="`, `">"`, or `">="`
+            value: the value compared against the column's values
+        Returns:
+            A sorted list of row offsets
+        Raises:
+            :class:`ItsdbError` if *op* is not a supported operator
+        Example:
+            >>> index = ts.get_index('item', 'i-id')
+            >>> index.lookup('<', 20)
+            [0, 1]
+        """
+        keys = self._keys
+        if op == '==':
+            start, end = bisect_left(keys, value), bisect_right(keys, value)
+        elif op == '<':
+            start, end = 0, bisect_left(keys, value)
+        elif op == '<=':
+            start, end = 0, bisect_right(keys, value)
+        elif op == '>':
+            start, end = bisect_right(keys, value), len(keys)
+        elif op == '>=':
+            start, end = bisect_left(keys, value), len(keys)
+        else:
+            raise ItsdbError('Unsupported index operator: {}'.format(op))
+        return sorted(self._rows[start:end])
+
+
+def _index_filename(tablename, column):
+    return '{}.{}{}'.format(tablename, column, _index_suffix)
+
+
+def _file_stat(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime)
+
+
+def _rebuild_indexes(profile_dir, tablename, fields, encoding='utf-8'):
+    # rebuild any existing indexes of a table after it is written
+    prefix = tablename + '.'
+    tablepath = os.path.join(profile_dir, tablename)
+    for filename in os.listdir(profile_dir):
+        if filename.startswith(prefix) and filename.endswith(_index_suffix):
+            column = filename[len(prefix):-len(_index_suffix)]
+            idxpath = os.path.join(profile_dir, filename)
+            if column in fields:
+                index = ColumnIndex.build(tablepath, fields, column,
+                                          encoding=encoding)
+                index.write(idxpath, encoding=encoding)
+            else:
+                os.remove(idxpath)
+
+
 class TestSuite(object):
     """
     A [incr tsdb()] testsuite database.
@@ -654,6 +878,7 @@ class TestSuite(object):
             )
 
         self._data = dict((t, None) for t in self.relations)
+        self._indexes = {}
 
         if self._path is not None:
             self.reload()
@@ -772,6 +997,143 @@ class TestSuite(object):
                     gzip=gzip,
                     encoding=self.encoding
                 )
+                _rebuild_indexes(path, tablename, relation, self.encoding)
+                if (path == self._path and relations is self.relations
+                        and data is self._data.get(tablename)):
+                    data.modified = False
+
+    def rewrite(self, tablename, func):
+        """
+        Rewrite the table *tablename* on disk by passing it through *func*.
+
+        The table file is streamed one line at a time: each line is
+        decoded into a :class:`Record` that is given to *func*, which
+        returns the record to write (modified or not) or `None` to
+        remove it. The output is written to a temporary file (with the
+        same compression as the original) that then atomically
+        replaces the table file, so the table is never fully held in
+        memory and an interrupted rewrite leaves the original intact.
+        Other tables are not touched.
+
+        The in-memory copy of the table, including any unsaved
+        changes, is discarded and the table is reloaded from disk on
+        its next access.
+
+        Args:
+            tablename: the name of the table to rewrite
+            func: a function that takes a :class:`Record` and returns
+                a :class:`Record` or `None`
+        Raises:
+            :class:`ItsdbError` if the testsuite has no path or the
+            table does not exist on disk
+        Example:
+            >>> def unrank(record):
+            ...     record['readings'] = 0
+            ...     return record
+            ...
+            >>> ts.rewrite('parse', unrank)
+        """
+        if self._path is None:
+            raise ItsdbError('Cannot rewrite tables of a testsuite '
+                             'that has no path.')
+        fields = self.relations[tablename]
+        path = _table_filename(os.path.join(self._path, tablename))
+        _rewrite_table(path, fields, func, self.encoding)
+        self._data[tablename] = None
+        _rebuild_indexes(self._path, tablename, fields, self.encoding)
+
+    def create_index(self, tablename, column):
+        """
+        Build a secondary index of *column* in *tablename* on disk.
+
+        The index is a sorted list of column values and the offsets of
+        the records that have them. It is written to a file beside the
+        table (e.g., `item.i-id.idx` for the `i-id` column of the
+        `item` table) and is used by :mod:`delphin.tsql` to answer
+        `==`, `<`, `<=`, `>`, and `>=` conditions on the column
+        without scanning the table. Existing indexes are rebuilt when
+        their table is written with :meth:`write` or :meth:`rewrite`;
+        indexes of tables modified by other means are ignored until
+        they are created again. Indexes are also not used for a table
+        with unsaved changes in memory (see :attr:`Table.modified`).
+
+        Args:
+            tablename: the name of the table to index
+            column: the name of the column to index
+        Returns:
+            The new :class:`ColumnIndex`
+        Raises:
+            :class:`ItsdbError` if the testsuite has no path, the
+            table does not exist on disk, or *column* is not a column
+            of the table
+        Example:
+            >>> ts.create_index('item', 'i-id')
+            >>> ts.create_index('parse', 'readings')
+        """
+        if self._path is None:
+            raise ItsdbError('Cannot index tables of a testsuite '
+                             'that has no path.')
+        fields = self.relations[tablename]
+        if column not in fields:
+            raise ItsdbError('Column {} is not in table {}'
+                             .format(column, tablename))
+        index = ColumnIndex.build(os.path.join(self._path, tablename),
+                                  fields, column, encoding=self.encoding)
+        index.write(os.path.join(self._path,
+                                 _index_filename(tablename, column)),
+                    encoding=self.encoding)
+        self._indexes[(tablename, column)] = index
+        return index
+
+    def get_index(self, tablename, column):
+        """
+        Return the index of *column* in *tablename*, if available.
+
+        Indexes are loaded from disk on first use. An index is only
+        returned if the table file has not changed since the index was
+        built.
+
+        Args:
+            tablename: the name of the indexed table
+            column: the name of the indexed column
+        Returns:
+            A :class:`ColumnIndex`, or `None` if the column is not
+            indexed or the index is out of date
+        """
+        if self._path is None:
+            return None
+        idxpath = os.path.join(self._path, _index_filename(tablename, column))
+        if not os.path.isfile(idxpath):
+            self._indexes.pop((tablename, column), None)
+            return None
+        try:
+            tblpath = _table_filename(os.path.join(self._path, tablename))
+        except ItsdbError:
+            return None
+        index = self._indexes.get((tablename, column))
+        if index is None or not index.is_current(tblpath):
+            index = ColumnIndex.from_file(idxpath, encoding=self.encoding)
+            self._indexes[(tablename, column)] = index
+        if not index.is_current(tblpath):
+            logging.info('Ignoring out-of-date index of {}:{}'
+                         .format(tablename, column))
+            return None
+        return index
+
+    def drop_index(self, tablename, column):
+        """
+        Remove the index of *column* in *tablename* from disk.
+
+        Args:
+            tablename: the name of the indexed table
+            column: the name of the indexed column
+        """
+        self._indexes.pop((tablename, column), None)
+        if self._path is not None:
+            idxpath = os.path.join(self._path,
+                                   _index_filename(tablename, column))
+            if os.path.isfile(idxpath):
+                os.remove(idxpath)
 
     def exists(self, table=None):
         """
@@ -868,6 +1230,71 @@ class TestSuite(object):
             self._data[tablename] = table
 
 
+class ProfileCollection(object):
+    """
+    A collection of [incr tsdb()] testsuites on disk.
+
+    Unlike a :class:`TestSuite`, a collection does not load any data
+    when it is created. It only records the paths of its testsuites so
+    that each one can be loaded and processed independently (e.g., in
+    a separate process by :func:`delphin.tsql.select`).
+
+    Args:
+        paths: a testsuite path or glob pattern (e.g.,
+            `'tsdb/gold/*'`), or an iterable of paths or patterns
+        relations: the path to a relations file used for every
+            testsuite; if not given, the relations file under each
+            testsuite's path is used
+        encoding: the character encoding of the files in the testsuites
+    Attributes:
+        paths (tuple): paths of the testsuite directories, sorted
+            within each pattern
+        relations (:py:class:`str`): path of the shared relations file,
+            or `None`
+        encoding (:py:class:`str`): character encoding used when
+            reading tables
+    Example:
+        >>> profiles = itsdb.ProfileCollection('erg/tsdb/gold/*')
+        >>> len(profiles)
+        40
+        >>> next(tsql.select('i-id readings', profiles))
+        ['erg/tsdb/gold/csli', 1, 2]
+    """
+    def __init__(self, paths, relations=None, encoding='utf-8'):
+        if isinstance(paths, stringtypes):
+            paths = [paths]
+        matched = []
+        for path in paths:
+            if os.path.isdir(path):
+                matched.append(path)
+            else:
+                matched.extend(p for p in sorted(glob.glob(path))
+                               if os.path.isdir(p))
+        if relations is not None and not os.path.isfile(relations):
+            raise ItsdbError('Relations file does not exist: {}'
+                             .format(relations))
+        self.paths = tuple(matched)
+        self.relations = relations
+        self.encoding = encoding
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def testsuites(self):
+        """
+        Yield a :class:`TestSuite` for each path in the collection.
+
+        Each testsuite is loaded only when it is reached.
+        """
+        for path in self.paths:
+            yield TestSuite(path,
+                            relations=self.relations,
+                            encoding=self.encoding)
+
+
 def _prepare_source(selector, source):
     tablename, fields = get_data_specifier(selector)
     if len(fields) != 1:
@@ -1114,6 +1541,27 @@ def _write_table(profile_dir, table_name, rows, fields,
     f.close()
 
 
+def _rewrite_table(path, fields, func, encoding='utf-8'):
+    dirname, basename = os.path.split(path)
+    fd, tmppath = tempfile.mkstemp(prefix='.' + basename + '.', dir=dirname)
+    os.close(fd)  # reopened below for text (and maybe gzip) output
+    try:
+        if path.endswith('.gz'):
+            f = TextIOWrapper(GzipFile(tmppath, mode='w'), encoding=encoding)
+        else:
+            f = io.open(tmppath, mode='w', encoding=encoding)
+        with f, _open_table(path, encoding) as tab:
+            for line in tab:
+                record = func(Record(fields, decode_row(line)))
+                if record is not None:
+                    f.write(encode_row(record) + '\n')
+        shutil.copymode(path, tmppath)  # mkstemp() files are private
+        replace_file(tmppath, path)
+    except Exception:
+        os.remove(tmppath)
+        raise
+
+
 def make_row(row, fields):
     """
     Encode a mapping of column name to values into a [incr tsdb()]
@@ -1152,12 +1600,19 @@ def select_rows(cols, rows, mode='list', cast=True):
     row             [incr tsdb()] row  `'10@1'`
     ==============  =================  ============================
 
+    The positions and datatype casts of *cols* are resolved once for
+    each table schema (i.e., once for all rows of a :class:`Table`)
+    rather than for each value. Values that are already of their
+    column's datatype (e.g., a :py:class:`datetime.datetime` for a
+    `:date` column) are kept as they are.
+
     Args:
         cols: an iterable of column names to select data for
         rows: the rows to select column data from
         mode: the form yielded data should take
         cast: if `True`, cast column values to their datatype
-            (requires *rows* to be :class:`Record` objects)
+            (requires *rows* to be :class:`Record` objects; other rows
+            are selected without casting)
 
     Yields:
         Selected data in the form specified by *mode*.
@@ -1173,17 +1628,61 @@ def select_rows(cols, rows, mode='list', cast=True):
         raise ItsdbError('Invalid mode for select operation: {}\n'
                          '  Valid options include: list, dict, row'
                          .format(mode))
+    fields = getters = None
     for row in rows:
-        if cast:
-            try:
-                data = [row.get(c, cast=True) for c in cols]
-            except TypeError:
-                data = [row.get(c) for c in cols]
-        else:
+        if not isinstance(row, Record):
             data = [row.get(c) for c in cols]
+        else:
+            if row.fields is not fields:
+                fields = row.fields
+                getters = _column_getters(cols, fields, cast)
+            data = _get_values(row, getters)
         yield modecast(cols, data)
 
 
+def _column_getters(cols, fields, cast):
+    """
+    Resolve the position and caster of each column in *cols*.
+
+    A column missing from *fields* has a position of `None`, and it
+    selects `None` as :meth:`Record.get` does.
+    """
+    tablenames = fields.name.split('+')
+    getters = []
+    for col in cols:
+        tablename, _, col = col.rpartition(':')
+        if tablename and tablename not in tablenames:
+            raise ItsdbError('column requested from wrong table: {}'
+                             .format(tablename))
+        try:
+            index = fields.index(col)
+        except KeyError:
+            getters.append((None, None))
+        else:
+            caster = None
+            if cast:
+                caster = _datatype_casts.get(fields[index].datatype)
+            getters.append((index, caster))
+    return getters
+
+
+def _get_values(row, getters):
+    get = list.__getitem__
+    data = []
+    for index, caster in getters:
+        if index is None:
+            value = None
+        else:
+            value = get(row, index)
+            if caster is not None:
+                try:
+                    value = caster(value)
+                except TypeError:
+                    pass  # already cast (e.g., a datetime for :date)
+        data.append(value)
+    return data
+
+
 def match_rows(rows1, rows2, key, sort_keys=True):
     """
     Yield triples of `(value, left_rows, right_rows)` where
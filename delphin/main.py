@@ -63,11 +63,23 @@ def call_convert(args):
 
 
 def call_select(args):
+    testsuite = args.TESTSUITE
+    if len(testsuite) == 1:
+        testsuite = testsuite[0]
+    if args.explain:
+        stages = select(
+            args.QUERY,
+            testsuite,
+            cast=False,
+            explain=True)
+        _print_explanation(stages)
+        return
     rows = select(
         args.QUERY,
-        args.TESTSUITE,
+        testsuite,
         mode='row',
-        cast=False)
+        cast=False,
+        jobs=args.jobs)
     for row in rows:
         print(row)
 
@@ -103,7 +115,8 @@ def call_compare(args):
     for result in compare(
             args.TESTSUITE,
             args.GOLD,
-            select=args.select):
+            select=args.select,
+            jobs=args.jobs):
         print(template.format(**result))
 
 
@@ -130,6 +143,26 @@ def _make_itsdb_actions(items):
     return actions
 
 
+def _print_explanation(stages):
+    template = '{:<10}  {:<9}  {:<32}  {:>9}  {:>9}  {:>10}'
+    print(template.format(
+        'clause', 'operation', 'table', 'rows in', 'rows out', 'time (s)'))
+    total = 0.0
+    for stage in stages:
+        table = stage['table']
+        if stage['operation'] == 'join':
+            table = '{} on {} ({})'.format(table, stage['on'], stage['how'])
+        print(template.format(
+            stage['clause'],
+            stage['operation'],
+            table,
+            stage['rows_in'],
+            stage['rows_out'],
+            '{:.6f}'.format(stage['time'])))
+        total += stage['time']
+    print(template.format('', '', '', '', '', '{:.6f}'.format(total)))
+
+
 # textwrap does not have indent() in Python2.7, so use this for now:
 def redent(s):
     lines = textwrap.dedent(s).splitlines()
@@ -225,7 +258,23 @@ select_parser.set_defaults(func=call_select)
 select_parser.add_argument(
     'QUERY', help='TSQL selection (e.g., \'i-input where readings = 0\')')
 select_parser.add_argument(
-    'TESTSUITE', help='path to the testsuite directory to select data from')
+    'TESTSUITE',
+    nargs='+',
+    help=('path to the testsuite directory to select data from; with '
+          'multiple paths or a glob pattern (e.g., \'tsdb/gold/*\'), '
+          'each row is prefixed with the path of its testsuite'))
+select_parser.add_argument(
+    '-j',
+    '--jobs',
+    metavar='N',
+    type=int,
+    help=('number of processes for selecting from multiple testsuites '
+          '(default: number of CPUs)'))
+select_parser.add_argument(
+    '--explain',
+    action='store_true',
+    help=('instead of the selected data, print the join path, row '
+          'counts, and time of each stage of the query'))
 
 # mkprof subparser
 mkprof_parser = argparse.ArgumentParser(add_help=False)
@@ -316,6 +365,13 @@ compare_parser.add_argument(
     default='item:i-id item:i-input result:mrs',
     help=('TSQL query for selecting (id, input, mrs) triples from '
           'TESTSUITE and GOLD (default: \'i-id i-input mrs\')'))
+compare_parser.add_argument(
+    '-j',
+    '--jobs',
+    metavar='N',
+    type=int,
+    default=1,
+    help='number of processes for comparing items (default: 1)')
 
 # repp subparser
 repp_parser = argparse.ArgumentParser(add_help=False)
@@ -297,7 +297,15 @@ class Link(namedtuple('Link', ('start', 'end', 'rargname', 'post'))):
 
 def links(xmrs):
     """Return the list of Links for the *xmrs*."""
+    # the TOP link depends on xmrs.top, which may be reassigned
+    key = ('links', xmrs.top)
+    cache = xmrs._cache
+    if key not in cache:
+        cache[key] = _links(xmrs)
+    return list(cache[key])
 
+
+def _links(xmrs):
     # Links exist for every non-intrinsic argument that has a variable
     # that is the intrinsic variable of some other predicate, as well
     # as for label equalities when no argument link exists (even
@@ -310,7 +318,7 @@ def links(xmrs):
     _vars = xmrs._vars
 
     lsh = xmrs.labelset_heads
-    lblheads = {v: lsh(v) for v, vd in _vars.items() if 'LBL' in vd['refs']}
+    lblheads = {v: lsh(v) for v, vd in _vars.items() if vd.has_role('LBL')}
 
     top = xmrs.top
     if top is not None:
@@ -323,8 +331,8 @@ def links(xmrs):
             prelinks.append((nid, ep[2], role, val, _vars[val]))
 
     for src, srclbl, role, val, vd in prelinks:
-        if IVARG_ROLE in vd['refs']:
-            tgtnids = [n for n in vd['refs'][IVARG_ROLE]
+        if vd.has_role(IVARG_ROLE):
+            tgtnids = [n for n in vd.nodeids(IVARG_ROLE)
                        if not _eps[n].is_quantifier()]
             if len(tgtnids) == 0:
                 continue  # maybe some bad MRS with a lonely quantifier
@@ -337,7 +345,7 @@ def links(xmrs):
                 continue  # broken MRS; log this?
             tgt = lblheads[lbl][0]  # sorted list; first item is most "heady"
             post = H_POST
-        elif 'LBL' in vd['refs']:
+        elif vd.has_role('LBL'):
             if val not in lblheads or len(lblheads[val]) == 0:
                 continue  # broken MRS; log this?
             tgt = lblheads[val][0]  # again, should be sorted already
@@ -436,6 +444,20 @@ def icons(xmrs):
 # PREDICATES AND PREDICATIONS
 
 
+# Preds are immutable, so the constructor classmethods return the same
+# object for the same arguments; the cache is emptied when it grows
+# too large
+_pred_cache = {}
+_pred_cache_limit = 100000
+
+
+def _cache_pred(key, pred):
+    if len(_pred_cache) >= _pred_cache_limit:
+        _pred_cache.clear()
+    _pred_cache[key] = pred
+    return pred
+
+
 class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     """
     A semantic predicate.
@@ -454,6 +476,11 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     normalized form. However, unlike with equality comparisons,
     Pred-formatted strings are not treated as equivalent in a hash.
 
+    The classmethods for instantiating Preds return the same object
+    when called again with the same arguments (as long as it remains
+    in a bounded cache), and the normalized form used for comparison
+    and hashing is computed once per object.
+
     Args:
         type: the type of predicate; valid values are
             Pred.ABSTRACT, Pred.REALPRED, and Pred.SURFACE,
@@ -499,11 +526,13 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     SURFACE = STRINGPRED = 2  # quoted string form of realpred
 
     def __eq__(self, other):
+        if other is self:
+            return True
         if other is None:
             return False
         if not isinstance(other, Pred):
             other = Pred.surface(other)
-        return self.short_form().lower() == other.short_form().lower()
+        return self.short_form() == other.short_form()
 
     def __str__ (self):
         return self.string
@@ -523,8 +552,13 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     @classmethod
     def surface(cls, predstr):
         """Instantiate a Pred from its quoted string representation."""
-        lemma, pos, sense, _ = split_pred_string(predstr)
-        return cls(Pred.SURFACE, lemma, pos, sense, predstr)
+        key = (cls, Pred.SURFACE, predstr)
+        pred = _pred_cache.get(key)
+        if pred is None:
+            lemma, pos, sense, _ = split_pred_string(predstr)
+            pred = _cache_pred(
+                key, cls(Pred.SURFACE, lemma, pos, sense, predstr))
+        return pred
 
     @classmethod
     @deprecated(final_version='1.0.0', alternative='Pred.abstract()')
@@ -535,8 +569,13 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     @classmethod
     def abstract(cls, predstr):
         """Instantiate a Pred from its symbol string."""
-        lemma, pos, sense, _ = split_pred_string(predstr)
-        return cls(Pred.ABSTRACT, lemma, pos, sense, predstr)
+        key = (cls, Pred.ABSTRACT, predstr)
+        pred = _pred_cache.get(key)
+        if pred is None:
+            lemma, pos, sense, _ = split_pred_string(predstr)
+            pred = _cache_pred(
+                key, cls(Pred.ABSTRACT, lemma, pos, sense, predstr))
+        return pred
 
     @classmethod
     @deprecated(final_version='1.0.0', alternative='Pred.surface_or_abstract()')
@@ -547,10 +586,15 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
     @classmethod
     def surface_or_abstract(cls, predstr):
         """Instantiate a Pred from either its surface or abstract symbol."""
-        if predstr.strip('"').lstrip("'").startswith('_'):
-            return cls.surface(predstr)
-        else:
-            return cls.abstract(predstr)
+        key = (cls, predstr)
+        pred = _pred_cache.get(key)
+        if pred is None:
+            if predstr.strip('"').lstrip("'").startswith('_'):
+                pred = cls.surface(predstr)
+            else:
+                pred = cls.abstract(predstr)
+            _cache_pred(key, pred)
+        return pred
 
     @classmethod
     def realpred(cls, lemma, pos, sense=None):
@@ -561,8 +605,13 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
         if sense is not None:
             sense = str(sense)
             string_tokens.append(sense)
-        predstr = '_'.join([''] + string_tokens + ['rel'])
-        return cls(Pred.REALPRED, lemma, pos, sense, predstr)
+        key = (cls, Pred.REALPRED, lemma, pos, sense)
+        pred = _pred_cache.get(key)
+        if pred is None:
+            predstr = '_'.join([''] + string_tokens + ['rel'])
+            pred = _cache_pred(
+                key, cls(Pred.REALPRED, lemma, pos, sense, predstr))
+        return pred
 
     def short_form(self):
         """
@@ -577,7 +626,11 @@ class Pred(namedtuple('Pred', ('type', 'lemma', 'pos', 'sense', 'string'))):
             >>> p.short_form()
             '_cat_n_1'
         """
-        return normalize_pred_string(self.string)
+        try:
+            return self._short_form
+        except AttributeError:
+            self._short_form = normalize_pred_string(self.string)
+            return self._short_form
 
     def is_quantifier(self):
         """
@@ -785,6 +838,15 @@ class Node(
 
 def nodes(xmrs):
     """Return the list of Nodes for *xmrs*."""
+    cache = xmrs._cache
+    if 'nodes' not in cache:
+        cache['nodes'] = _nodes(xmrs)
+    # sortinfo dicts are mutable, so each call gets its own Nodes
+    return [node._replace(sortinfo=dict(node.sortinfo))
+            for node in cache['nodes']]
+
+
+def _nodes(xmrs):
     nodes = []
     _props = xmrs.properties
     varsplit = sort_vid_split
@@ -304,7 +304,7 @@ def non_argument_modifiers(role='ARG1', only_connecting=True):
         if not only_connecting or len(set(ccmap.values())) > 1:
             lsh = xmrs.labelset_heads
             lblheads = {v: lsh(v) for v, vd in xmrs._vars.items()
-                        if 'LBL' in vd['refs']}
+                        if vd.has_role('LBL')}
             for heads in lblheads.values():
                 if len(heads) > 1:
                     first = heads[0]
@@ -299,7 +299,7 @@ def serialize(ms, properties=True, encoding='unicode', pretty_print=False):
 
 def _encode_mrs(m, properties):
     if properties:
-        varprops = {v: d['props'] for v, d in m._vars.items() if d['props']}
+        varprops = {v: d.props for v, d in m._vars.items() if d.props}
     else:
         varprops = {}
     attributes = {'cfrom': str(m.cfrom), 'cto': str(m.cto)}
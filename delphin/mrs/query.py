@@ -323,7 +323,7 @@ def in_labelset(xmrs, nodeids, label=None):
     nodeids = set(nodeids)
     if label is None:
         label = xmrs.ep(next(iter(nodeids))).label
-    return nodeids.issubset(xmrs._vars[label]['refs']['LBL'])
+    return nodeids.issubset(xmrs._vars[label].nodeids('LBL'))
 
 
 # deprecated
@@ -56,7 +56,7 @@ _default_mrs_delim = '\n'
 
 
 def load(fh, single=False, version=_default_version,
-         strict=False, errors='warn'):
+         strict=False, errors='warn', validate='always'):
     """
     Deserialize SimpleMRSs from a file (handle or filename)
 
@@ -69,30 +69,85 @@ def load(fh, single=False, version=_default_version,
         errors: if `'strict'`, ill-formed MRSs raise an error; if
             `'warn'`, raise a warning instead; if `'ignore'`, do not
             warn or raise errors for ill-formed MRSs
+        validate: when to check MRSs for well-formedness; if
+            `'always'`, every MRS is checked as it is read; if
+            `'lazy'`, an MRS is checked the first time its
+            :meth:`~delphin.mrs.xmrs.Xmrs.is_well_formed` method is
+            called; if `'sample:N'` (e.g., `'sample:100'`), only the
+            first of every *N* MRSs is checked; if `'off'`, no MRSs
+            are checked
     Returns:
         a generator of Xmrs objects (unless the *single* option is
         `True`)
+
+    The whole file is read before this function returns, so the file
+    may be closed before the Xmrs objects are used; see
+    :func:`iterload` for reading large files incrementally.
     """
     if isinstance(fh, stringtypes):
-        s = open(fh, 'r').read()
+        with open(fh, 'r') as f:
+            s = f.read()
     else:
         s = fh.read()
     return loads(s, single=single, version=version,
-                 strict=strict, errors=errors)
+                 strict=strict, errors=errors, validate=validate)
+
+
+def iterload(fh, version=_default_version,
+             strict=False, errors='warn', validate='always'):
+    """
+    Deserialize SimpleMRSs incrementally from a file (handle or filename)
+
+    Unlike :func:`load`, the file is read in chunks as the returned
+    generator is iterated, and each Xmrs object is yielded as soon as
+    it has been read, so memory use depends on the size of the
+    largest MRS and not on the size of the file. A file object must
+    therefore stay open until the generator is exhausted; a file
+    opened from a filename is closed when the generator finishes.
+
+    Args:
+        fh (str, file): input filename or file object
+        strict: see :func:`load`
+        errors: see :func:`load`
+        validate: see :func:`load`
+    Returns:
+        a generator of Xmrs objects
+    Example:
+        >>> with open('large.mrs') as fh:
+        ...     for m in simplemrs.iterload(fh):
+        ...         print(len(m.eps()))
+    """
+    check = _validator(validate, _errors(strict, errors))
+    if isinstance(fh, stringtypes):
+        return _iterload(open(fh, 'r'), version, check, close=True)
+    return _iterload(fh, version, check)
+
+
+def _iterload(fh, version, check, close=False):
+    try:
+        for m in _read_file(fh, version):
+            check(m)
+            yield m
+    finally:
+        if close:
+            fh.close()
 
 
 def loads(s, single=False, version=_default_version,
-          strict=False, errors='warn'):
+          strict=False, errors='warn', validate='always'):
     """
     Deserialize SimpleMRS string representations
 
     Args:
         s (str): a SimpleMRS string
         single (bool): if `True`, only return the first Xmrs object
+        errors: see :func:`load`
+        validate: see :func:`load`
     Returns:
         a generator of Xmrs objects (unless *single* is `True`)
     """
-    ms = deserialize(s, version=version, strict=strict, errors=errors)
+    ms = deserialize(s, version=version, strict=strict, errors=errors,
+                     validate=validate)
     if single:
         return next(ms)
     else:
@@ -181,21 +236,134 @@ def tokenize(string):
     return deque(_tokenizer.findall(string))
 
 
+def _read_file(fh, version, chunksize=65536):
+    """
+    Yield the MRSs of the SimpleMRS file *fh*, read in chunks.
+
+    Only complete lines are tokenized, as no tokens but strings span
+    lines, and only the tokens up to the end of the last complete MRS
+    are parsed; the rest wait for the next chunk.
+    """
+    tokens = []
+    depth = 0  # bracket depth at the end of tokens
+    buf = ''
+    while True:
+        chunk = fh.read(chunksize)
+        if not chunk:
+            break
+        buf += chunk
+        end = buf.rfind('\n') + 1
+        toks, end = _tokenize_lines(buf, end)
+        buf = buf[end:]
+        tokens.extend(toks)
+        depth += toks.count('[') - toks.count(']')
+        if depth > 0:
+            # find the end of the last MRS completed in this chunk
+            d = depth
+            for i in range(len(toks) - 1, -1, -1):
+                tok = toks[i]
+                if tok == ']':
+                    if d == 0:
+                        cut = len(tokens) - len(toks) + i + 1
+                        for m in _read_mrss(tokens[:cut], version):
+                            yield m
+                        tokens = tokens[cut:]
+                        break
+                    d += 1
+                elif tok == '[':
+                    d -= 1
+        else:
+            for m in _read_mrss(tokens, version):
+                yield m
+            tokens = []
+    tokens.extend(_tokenizer.findall(buf))
+    for m in _read_mrss(tokens, version):
+        yield m
+
+
+def _tokenize_lines(buf, end):
+    """
+    Tokenize *buf* up to *end* and return the tokens and the position
+    where tokenization stopped.
+
+    If a string is still open at *end*, the tokenizer would skip its
+    opening quote, so tokenization stops before the string instead.
+    """
+    text = buf[:end]
+    toks = _tokenizer.findall(text)
+    if text.count('"') == ''.join(toks).count('"'):
+        return toks, end
+    toks = []
+    pos = 0
+    for match in _tokenizer.finditer(buf, 0, end):
+        if buf[pos:match.start()].strip():
+            break  # skipped the opening quote of an unclosed string
+        toks.append(match.group(0))
+        pos = match.end()
+    return toks, pos
+
+
 def _invalid_token_error(token, expected):
     raise XDE('Invalid token: "{}"\tExpected: "{}"'.format(token, expected))
 
 
-def deserialize(string, version=_default_version, strict=True, errors='warn'):
+def deserialize(string, version=_default_version, strict=True, errors='warn',
+                validate='always'):
+    errors = _errors(strict, errors)
+    check = _validator(validate, errors)
+    for m in _read_mrss(_tokenizer.findall(string), version):
+        check(m)
+        yield m
+
+
+def _errors(strict, errors):
     if strict:
-        warnings.warn(
+        warn(
             'strict=True parameter is deprecated; use errors=\'strict\'',
             DeprecationWarning
         )
         errors = 'strict'
-    # FIXME: consider buffering this so we don't read the whole string at once
-    tokens = tokenize(string)
-    while tokens:
-        yield _read_mrs(tokens, version, errors)
+    return errors
+
+
+def _validator(validate, errors):
+    """
+    Return a function that applies the *validate* policy to each MRS.
+    """
+    if errors == 'ignore' or validate == 'off':
+        return lambda m: None
+    elif validate == 'always':
+        return lambda m: _validate(m, errors)
+    elif validate == 'lazy':
+        def check(m):
+            m._deferred_errors = errors
+        return check
+    elif validate.startswith('sample:'):
+        try:
+            n = int(validate[7:])
+        except ValueError:
+            n = 0
+        if n < 1:
+            raise ValueError('Invalid sample size: {}'.format(validate))
+        counter = [0]
+
+        def check(m):
+            if counter[0] % n == 0:
+                _validate(m, errors)
+            counter[0] += 1
+        return check
+    else:
+        raise ValueError('Invalid validation policy: {}'.format(validate))
+
+
+def _validate(m, errors):
+    try:
+        m.validate()
+    except XmrsError as ex:
+        if errors == 'warn':
+            warn(str(ex), XmrsWarning)
+        elif errors == 'strict':
+            raise
 
 
 def _read_literals(tokens, *toks):
@@ -207,7 +375,216 @@ def _read_literals(tokens, *toks):
             )
 
 
-def _read_mrs(tokens, version, errors):
+def _read_mrss(toks, version):
+    """
+    Yield the MRSs in the token list *toks*.
+
+    Each MRS is first read by :func:`_read_mrs_fast`, and if that
+    fails its tokens are read again by :func:`_read_mrs`, which
+    handles all variations of the format and reports errors.
+    """
+    i, n = 0, len(toks)
+    while i < n:
+        try:
+            m, i = _read_mrs_fast(toks, i, version)
+        except (_Unusual, IndexError, ValueError):
+            j = _mrs_end(toks, i)
+            tokens = deque(toks[i:j])
+            m = _read_mrs(tokens, version)
+            i = j - len(tokens)
+        yield m
+
+
+def _mrs_end(toks, i):
+    """Return the index after the ] closing the [ at *toks[i]*."""
+    depth = 0
+    for j in range(i, len(toks)):
+        tok = toks[j]
+        if tok == '[':
+            depth += 1
+        elif tok == ']':
+            depth -= 1
+            if depth <= 0:
+                return j + 1
+    return len(toks)
+
+
+class _Unusual(Exception):
+    """Raised when the fast reader meets a non-canonical form."""
+
+
+# Lnks and strings are immutable, so the fast reader shares them across
+# MRSs (as Pred does for Preds); the caches are emptied when they grow
+# too large
+_lnk_cache = {}
+_str_cache = {}
+_cache_limit = 100000
+
+
+def _cached_charspan(start, end):
+    if len(_lnk_cache) >= _cache_limit:
+        _lnk_cache.clear()
+    lnk = _lnk_cache[(start, end)] = Lnk.charspan(start, end)
+    return lnk
+
+
+def _read_mrs_fast(toks, i, version):
+    """
+    Read the MRS starting at *toks[i]* and return it with the index
+    of the token after it.
+
+    This reader only accepts the canonical forms of SimpleMRS produced
+    by ACE and the LKB (e.g., uppercase feature names and
+    character-span lnks) and it raises :exc:`_Unusual` (or an
+    :exc:`IndexError` or :exc:`ValueError`) on anything else. It
+    otherwise does the same as :func:`_read_mrs` with index
+    arithmetic on a token list instead of a deque and without the
+    helper-function calls for each token.
+    """
+    CARG = CONSTARG_ROLE
+    match_var = var_re.match
+    make_pred, lnks = Pred.surface_or_abstract, _lnk_cache
+    if len(_str_cache) >= _cache_limit:
+        _str_cache.clear()
+    # roles, variables, and properties are shared, not the tokens
+    share = _str_cache.setdefault
+    EP = ElementaryPredication
+
+    if toks[i] != '[':
+        raise _Unusual
+    i += 1
+    top = idx = surface = lnk = rels = hcons = icons = None
+    vars_ = {}
+    if version >= 1.1:
+        if toks[i] == '<':
+            if toks[i + 2] != ':' or toks[i + 4] != '>':
+                raise _Unusual
+            lnk = (lnks.get((toks[i + 1], toks[i + 3]))
+                   or _cached_charspan(toks[i + 1], toks[i + 3]))
+            i += 5
+        if toks[i][0] == '"':
+            surface = toks[i][1:-1]
+            i += 1
+    if toks[i] in ('LTOP', 'TOP'):
+        if toks[i + 1] != ':':
+            raise _Unusual
+        top = share(toks[i + 2], toks[i + 2])
+        vars_[top] = []
+        i += 3
+    if toks[i] == 'INDEX':
+        if toks[i + 1] != ':':
+            raise _Unusual
+        idx = share(toks[i + 2], toks[i + 2])
+        i += 3
+        props = []
+        if toks[i] == '[':
+            props, i = _read_props_fast(toks, i, share)
+        vars_[idx] = props
+    if toks[i] == 'RELS':
+        if toks[i + 1] != ':' or toks[i + 2] != '<':
+            raise _Unusual
+        i += 3
+        rels = []
+        nid = 10000
+        while toks[i] != '>':
+            if toks[i] != '[':
+                raise _Unusual
+            pred = make_pred(toks[i + 1])
+            i += 2
+            eplnk = epsurface = label = None
+            if toks[i] == '<':
+                if toks[i + 2] != ':' or toks[i + 4] != '>':
+                    raise _Unusual
+                eplnk = (lnks.get((toks[i + 1], toks[i + 3]))
+                         or _cached_charspan(toks[i + 1], toks[i + 3]))
+                i += 5
+            if toks[i][0] == '"':
+                epsurface = toks[i][1:-1]
+                i += 1
+            if toks[i] == 'LBL':
+                if toks[i + 1] != ':':
+                    raise _Unusual
+                label = share(toks[i + 2], toks[i + 2])
+                vars_[label] = []
+                i += 3
+            args = {}
+            role = toks[i]
+            while role != ']':
+                if toks[i + 1] != ':' or not role.isupper():
+                    raise _Unusual
+                val = toks[i + 2]
+                i += 3
+                if role == CARG:
+                    if val and (val[0], val[-1]) == ('"', '"'):
+                        val = val[1:-1]
+                elif match_var(val) is not None:
+                    val = share(val, val)
+                    if val not in vars_:
+                        vars_[val] = []
+                    if toks[i] == '[':
+                        props, i = _read_props_fast(toks, i, share)
+                        vars_[val].extend(props)
+                args[share(role, role)] = val
+                role = toks[i]
+            i += 1
+            rels.append(EP(nid, pred, label, args, eplnk, epsurface))
+            nid += 1
+        i += 1
+    if toks[i] == 'HCONS':
+        hcons, i = _read_cons_fast(toks, i, vars_, share)
+    if toks[i] == 'ICONS':
+        icons, i = _read_cons_fast(toks, i, vars_, share)
+    if toks[i] != ']':
+        raise _Unusual
+    m = Mrs(top=top, index=idx, rels=rels,
+            hcons=hcons, icons=icons,
+            lnk=lnk, surface=surface, vars=vars_)
+    return m, i + 1
+
+
+def _read_props_fast(toks, i, share):
+    # toks[i] is '[' and toks[i + 1] is the discarded variable type
+    props = []
+    i += 2
+    while toks[i] != ']':
+        if toks[i + 1] != ':':
+            raise _Unusual
+        prop, val = toks[i], toks[i + 2]
+        props.append((share(prop, prop), share(val, val)))
+        i += 3
+    return props, i + 1
+
+
+def _read_cons_fast(toks, i, vars_, share):
+    # toks[i] is HCONS or ICONS
+    if toks[i + 1] != ':' or toks[i + 2] != '<':
+        raise _Unusual
+    i += 3
+    cons = []
+    while toks[i] != '>':
+        left = share(toks[i], toks[i])
+        i += 1
+        lprops = []
+        if toks[i] == '[':
+            lprops, i = _read_props_fast(toks, i, share)
+        reln = toks[i].lower()
+        reln = share(reln, reln)
+        rght = share(toks[i + 1], toks[i + 1])
+        i += 2
+        if toks[i] == '[':
+            _, i = _read_props_fast(toks, i, share)
+        cons.append((left, reln, rght))
+        # like _read_cons(), both variables get the left properties
+        if left not in vars_:
+            vars_[left] = []
+        vars_[left].extend(lprops)
+        if rght not in vars_:
+            vars_[rght] = []
+        vars_[rght].extend(lprops)
+    return cons, i + 1
+
+
+def _read_mrs(tokens, version):
     #return read_mrs(tokens)
     try:
         _read_literals(tokens, '[')
@@ -240,14 +617,6 @@ def _read_mrs(tokens, version, errors):
                 lnk=lnk, surface=surface, vars=vars_)
     except IndexError:
         _unexpected_termination_error()
-    if errors != 'ignore':
-        try:
-            m.validate()
-        except XmrsError as ex:
-            if errors == 'warn':
-                warn(str(ex), XmrsWarning)
-            elif errors == 'strict':
-                raise
     return m
 
 
@@ -394,7 +763,7 @@ def _serialize_mrs(m, properties, version=_default_version, pretty_print=False):
     # note that varprops is modified as a side-effect of the lower
     # functions
     if properties:
-        varprops = {v: d['props'] for v, d in m._vars.items() if d['props']}
+        varprops = {v: d.props for v, d in m._vars.items() if d.props}
     else:
         varprops = {}
     toks = []
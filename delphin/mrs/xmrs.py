@@ -5,8 +5,9 @@ Classes and functions for general \*MRS processing.
 
 from collections import (defaultdict, deque)
 from itertools import chain
+from warnings import warn
 
-from delphin.exceptions import (XmrsError, XmrsStructureError)
+from delphin.exceptions import (XmrsError, XmrsStructureError, XmrsWarning)
 from delphin.util import safe_int
 from .components import (
     ElementaryPredication, HandleConstraint, IndividualConstraint,
@@ -62,6 +63,10 @@ class Xmrs(_LnkMixin):
         identifier: a discourse-utterance ID (often unset)
     """
 
+    # set by deserializers that defer validation to is_well_formed()
+    # to the *errors* policy ('warn' or 'strict') to apply then
+    _deferred_errors = None
+
     def __init__(self, top=None, index=None, xarg=None,
                  eps=None, hcons=None, icons=None, vars=None,
                  lnk=None, surface=None, identifier=None):
@@ -72,9 +77,10 @@ class Xmrs(_LnkMixin):
         self._eps = {}
         self._hcons = {}
         self._icons = {}
-        self._vars = defaultdict(
-            lambda: {'props': [], 'refs': defaultdict(list)}
-        )
+        self._vars = defaultdict(_XmrsVariable)
+        # derived structures (links, labelset heads, etc.) computed
+        # on demand; emptied whenever EPs, HCONS, or ICONS are added
+        self._cache = {}
 
         # just calling __getitem__ will instantiate them on _vars
         if top is not None: self._vars[top]
@@ -85,8 +91,10 @@ class Xmrs(_LnkMixin):
             _vars = self._vars
             for var, props in vars.items():
                 if hasattr(props, 'items'):
-                    props = list(props.items())
-                _vars[var]['props'] = props
+                    props = props.items()
+                vd = _vars[var]
+                if props:
+                    vd.props = _shared_props(props)
         if eps is not None:
             self.add_eps(eps)
         if hcons is not None:
@@ -123,38 +131,45 @@ class Xmrs(_LnkMixin):
         """
         # (nodeid, pred, label, args, lnk, surface, base)
         _nodeids, _eps, _vars = self._nodeids, self._eps, self._vars
-        for ep in eps:
-            try:
-                if not isinstance(ep, ElementaryPredication):
-                    ep = ElementaryPredication(*ep)
-            except TypeError:
-                raise XmrsError('Invalid EP data: {}'.format(repr(ep)))
-            # eplen = len(ep)
-            # if eplen < 3:
-            #     raise XmrsError(
-            #         'EPs must have length >= 3: (nodeid, pred, label, ...)'
-            #     )
-            nodeid, lbl = ep.nodeid, ep.label
-            if nodeid in _eps:
-                raise XmrsError(
-                    'EP already exists in Xmrs: {} ({})'
-                    .format(nodeid, ep[1])
-                )
-            _nodeids.append(nodeid)
-            _eps[nodeid] = ep
-            if lbl is not None:
-                _vars[lbl]['refs']['LBL'].append(nodeid)
-            for role, val in ep.args.items():
-                # if the val is not in _vars, it might still be a
-                # variable; check with var_re
-                if val in _vars or var_re.match(val):
-                    vardict = _vars[val]
-                    vardict['refs'][role].append(nodeid)
-                    # if role == IVARG_ROLE:
-                    #     if pred.is_quantifier():
-                    #         vardict['bv'] = nodeid
-                    #     else:
-                    #         vardict['iv'] = nodeid
+        self._cache.clear()
+        # collect new references in lists and extend each variable's
+        # tuple once, as extending it for each reference is quadratic
+        refs = defaultdict(list)
+        try:
+            for ep in eps:
+                try:
+                    if not isinstance(ep, ElementaryPredication):
+                        ep = ElementaryPredication(*ep)
+                except TypeError:
+                    raise XmrsError('Invalid EP data: {}'.format(repr(ep)))
+                # eplen = len(ep)
+                # if eplen < 3:
+                #     raise XmrsError(
+                #     'EPs must have length >= 3: (nodeid, pred, label, ...)'
+                #     )
+                nodeid, lbl = ep.nodeid, ep.label
+                if nodeid in _eps:
+                    raise XmrsError(
+                        'EP already exists in Xmrs: {} ({})'
+                        .format(nodeid, ep[1])
+                    )
+                _nodeids.append(nodeid)
+                _eps[nodeid] = ep
+                if lbl is not None:
+                    refs[lbl].extend(('LBL', nodeid))
+                for role, val in ep.args.items():
+                    # if the val is not in _vars, it might still be a
+                    # variable; check with var_re
+                    if val in refs or val in _vars or var_re.match(val):
+                        refs[val].extend((role, nodeid))
+                        # if role == IVARG_ROLE:
+                        #     if pred.is_quantifier():
+                        #         vardict['bv'] = nodeid
+                        #     else:
+                        #         vardict['iv'] = nodeid
+        finally:
+            for var, varrefs in refs.items():
+                _vars[var].refs += tuple(varrefs)
 
     def add_hcons(self, hcons):
         """
@@ -163,48 +178,58 @@ class Xmrs(_LnkMixin):
         # (hi, relation, lo)
         _vars = self._vars
         _hcons = self._hcons
-        for hc in hcons:
-            try:
-                if not isinstance(hc, HandleConstraint):
-                    hc = HandleConstraint(*hc)
-            except TypeError:
-                raise XmrsError('Invalid HCONS data: {}'.format(repr(hc)))
-
-            hi = hc.hi
-            lo = hc.lo
-            if hi in _hcons:
-                raise XmrsError(
-                    'Handle constraint already exists for hole %s.' % hi
-                )
-            _hcons[hi] = hc
-            # the following should also ensure lo and hi are in _vars
-            if 'hcrefs' not in _vars[lo]:
-                _vars[lo]['hcrefs'] = []
-            for role, refs in _vars[hi]['refs'].items():
-                for nodeid in refs:
-                    _vars[lo]['hcrefs'].append((nodeid, role, hi))
+        self._cache.clear()
+        hcrefs = defaultdict(list)  # extend the tuples once (see add_eps)
+        try:
+            for hc in hcons:
+                try:
+                    if not isinstance(hc, HandleConstraint):
+                        hc = HandleConstraint(*hc)
+                except TypeError:
+                    raise XmrsError('Invalid HCONS data: {}'.format(repr(hc)))
+
+                hi = hc.hi
+                lo = hc.lo
+                if hi in _hcons:
+                    raise XmrsError(
+                        'Handle constraint already exists for hole %s.' % hi
+                    )
+                _hcons[hi] = hc
+                # the following should also ensure lo and hi are in _vars
+                _vars[lo]
+                lorefs = hcrefs[lo]
+                for role, refs in _vars[hi].roles().items():
+                    lorefs.extend((nodeid, role, hi) for nodeid in refs)
+        finally:
+            for var, varrefs in hcrefs.items():
+                _vars[var].hcrefs += tuple(varrefs)
 
     def add_icons(self, icons):
         """
         Incorporate the individual constraints given by *icons*.
         """
         _vars, _icons = self._vars, self._icons
-        for ic in icons:
-            try:
-                if not isinstance(ic, IndividualConstraint):
-                    ic = IndividualConstraint(*ic)
-            except TypeError:
-                raise XmrsError('Invalid ICONS data: {}'.format(repr(ic)))
-            left = ic.left
-            right = ic.right
-            if left not in _icons:
-                _icons[left] = []
-            _icons[left].append(ic)
-            # the following should also ensure left and right are in _vars
-            if 'icrefs' not in _vars[right]:
-                _vars[right]['icrefs'] = []
-            _vars[right]['icrefs'].append(ic)
-            _vars[left]  # just to instantiate if not done yet
+        self._cache.clear()
+        icrefs = defaultdict(list)  # extend the tuples once (see add_eps)
+        try:
+            for ic in icons:
+                try:
+                    if not isinstance(ic, IndividualConstraint):
+                        ic = IndividualConstraint(*ic)
+                except TypeError:
+                    raise XmrsError('Invalid ICONS data: {}'.format(repr(ic)))
+                left = ic.left
+                right = ic.right
+                if left not in _icons:
+                    _icons[left] = []
+                _icons[left].append(ic)
+                # the following should also ensure left and right are in
+                # _vars
+                icrefs[right].append(ic)
+                _vars[left]  # just to instantiate if not done yet
+        finally:
+            for var, varrefs in icrefs.items():
+                _vars[var].icrefs += tuple(varrefs)
 
     def __repr__(self):
         if self.surface is not None:
@@ -281,8 +306,8 @@ class Xmrs(_LnkMixin):
             _vars = self._vars
             nids = []
             for iv in ivs:
-                if iv in _vars and IVARG_ROLE in _vars[iv]['refs']:
-                    nids.extend(_vars[iv]['refs'][IVARG_ROLE])
+                if iv in _vars and _vars[iv].has_role(IVARG_ROLE):
+                    nids.extend(_vars[iv].nodeids(IVARG_ROLE))
                 else:
                     raise KeyError(iv)
         if quantifier is not None:
@@ -350,17 +375,18 @@ class Xmrs(_LnkMixin):
                 properties associated with the intrinsic variable of the
                 predication given by the nodeid
         """
-        props = []
+        props = ()
         if var_or_nodeid in self._vars:
-            props = self._vars[var_or_nodeid]['props']
+            props = self._vars[var_or_nodeid].props
         elif var_or_nodeid in self._eps:
             var = self._eps[var_or_nodeid][3].get(IVARG_ROLE)
-            props = self._vars.get(var, {}).get('props', [])
+            if var in self._vars:
+                props = self._vars[var].props
         else:
             raise KeyError(var_or_nodeid)
         if not as_list:
-            props = dict(props)
-        return props
+            return dict(props)
+        return list(props)
 
     def pred(self, nodeid):
         """
@@ -446,9 +472,10 @@ class Xmrs(_LnkMixin):
             if arg == IVARG_ROLE or val not in _vars:
                 del args[arg]
             else:
-                refs = _vars[val]['refs']
+                vd = _vars[val]
                 # don't include if not HCONS or pointing to other IV or LBL
-                if not (val in _hcons or IVARG_ROLE in refs or 'LBL' in refs):
+                if not (val in _hcons or vd.has_role(IVARG_ROLE) or
+                        vd.has_role('LBL')):
                     del args[arg]
         return args
 
@@ -465,6 +492,12 @@ class Xmrs(_LnkMixin):
         Returns:
             dict: `{source_nodeid: {rargname: value}}`
         """
+        cache = self._cache.setdefault('incoming_args', {})
+        if nodeid not in cache:
+            cache[nodeid] = self._incoming_args(nodeid)
+        return {nid: dict(args) for nid, args in cache[nodeid].items()}
+
+    def _incoming_args(self, nodeid):
         _vars = self._vars
         ep = self._eps[nodeid]
         lbl = ep[2]
@@ -472,16 +505,16 @@ class Xmrs(_LnkMixin):
         in_args_list = []
         # variable args
         if iv in _vars:
-            for role, nids in _vars[iv]['refs'].items():
+            for role, nids in _vars[iv].roles().items():
                 # ignore intrinsic args, even if shared
                 if role != IVARG_ROLE:
                     in_args_list.append((nids, role, iv))
         if lbl in _vars:
-            for role, nids in _vars[lbl]['refs'].items():
+            for role, nids in _vars[lbl].roles().items():
                 # basic label equality isn't "incoming"; ignore
                 if role != 'LBL':
                     in_args_list.append((nids, role, lbl))
-            for nid, role, hi in _vars[lbl].get('hcrefs', []):
+            for nid, role, hi in _vars[lbl].hcrefs:
                 in_args_list.append(([nid], role, hi))
         in_args = {}
         for nids, role, tgt in in_args_list:
@@ -500,7 +533,7 @@ class Xmrs(_LnkMixin):
         Returns:
             A set of nodeids, which may be an empty set.
         """
-        return self._vars[label]['refs']['LBL']
+        return self._vars[label].nodeids('LBL')
 
     def labelset_heads(self, label):
         """
@@ -511,17 +544,25 @@ class Xmrs(_LnkMixin):
         Returns:
             An iterable of nodeids.
         """
+        cache = self._cache.setdefault('labelset_heads', {})
+        if label not in cache:
+            cache[label] = self._labelset_heads(label)
+        return list(cache[label])
+
+    def _labelset_heads(self, label):
         _eps = self._eps
         _vars = self._vars
         _hcons = self._hcons
         nodeids = {nodeid: _eps[nodeid][3].get(IVARG_ROLE, None)
-                for nodeid in _vars[label]['refs']['LBL']}
+                for nodeid in _vars[label].nodeids('LBL')}
         if len(nodeids) <= 1:
             return list(nodeids)
 
+        # scopes are shared by the labelsets of nested scopal arguments
+        scopes = self._cache.setdefault('scopes', {})
         scope_sets = {}
         for nid in nodeids:
-            scope_sets[nid] = _ivs_in_scope(nid, _eps, _vars, _hcons)
+            scope_sets[nid] = _ivs_in_scope(nid, _eps, _vars, _hcons, scopes)
 
         out = {}
         for n in nodeids:
@@ -580,10 +621,10 @@ class Xmrs(_LnkMixin):
         # what about xarg? I'm not really sure.. just put it in
         if self.xarg:
             xarg = self.xarg
-            subvars[self.xarg] = _vars[self.xarg]['props']
+            subvars[self.xarg] = _vars[self.xarg].props
         subvars.update((lbl, {}) for lbl in lbls)
         subvars.update(
-            (var, _vars[var]['props'])
+            (var, _vars[var].props)
             for ep in eps for var in ep[3].values()
             if var in _vars
         )
@@ -613,39 +654,52 @@ class Xmrs(_LnkMixin):
         nids = set(self._nodeids)  # the nids left to find
         if len(nids) == 0:
             raise XmrsError('Cannot compute connectedness of an empty Xmrs.')
+        _eps, _vars, _hcons = self._eps, self._vars, self._hcons
         # build a basic dict graph of relations
-        edges = []
-        # label connections
-        for lbl in self.labels():
-            lblset = self.labelset(lbl)
-            edges.extend((x, y) for x in lblset for y in lblset if x != y)
+        g = {nid: [] for nid in nids}
+        # the predications selected by each label and intrinsic
+        # variable; linking each predication to the first one with the
+        # same label connects the same nodes as linking every pair
+        lblnids, ivnids = {}, {}
+        for nid in self._nodeids:
+            ep = _eps[nid]
+            lbl = ep[2]
+            if lbl is not None:
+                if lbl in lblnids:
+                    first = lblnids[lbl][0]
+                    g[nid].append(first)
+                    g[first].append(nid)
+                    lblnids[lbl].append(nid)
+                else:
+                    lblnids[lbl] = [nid]
+            iv = ep[3].get(IVARG_ROLE)
+            if iv is not None:
+                ivnids.setdefault(iv, []).append(nid)
         # argument connections
-        _vars = self._vars
         for nid in nids:
-            for rarg, tgt in self.args(nid).items():
+            for tgt in _eps[nid][3].values():
                 if tgt not in _vars:
                     continue
-                if IVARG_ROLE in _vars[tgt]['refs']:
-                    tgtnids = list(_vars[tgt]['refs'][IVARG_ROLE])
-                elif tgt in self._hcons:
-                    tgtnids = list(self.labelset(self.hcon(tgt)[2]))
-                elif 'LBL' in _vars[tgt]['refs']:
-                    tgtnids = list(_vars[tgt]['refs']['LBL'])
+                if tgt in ivnids:
+                    tgtnids = ivnids[tgt]
+                elif tgt in _hcons:
+                    tgtnids = lblnids.get(_hcons[tgt][2], ())
+                elif tgt in lblnids:
+                    tgtnids = lblnids[tgt]
                 else:
-                    tgtnids = []
+                    continue
                 # connections are bidirectional
-                edges.extend((nid, t) for t in tgtnids if nid != t)
-                edges.extend((t, nid) for t in tgtnids if nid != t)
-        g = {nid: set() for nid in nids}
-        for x, y in edges:
-            g[x].add(y)
-        connected_nids = _bfs(g)
+                for t in tgtnids:
+                    if t != nid:
+                        g[nid].append(t)
+                        g.setdefault(t, []).append(nid)
+        connected_nids = _bfs(g, start=next(iter(nids)))
         if connected_nids == nids:
             return True
         elif connected_nids.difference(nids):
             raise XmrsError(
                 'Possibly bogus nodeids: {}'
-                .format(', '.join(connected_nids.difference(nids)))
+                .format(', '.join(map(str, connected_nids.difference(nids))))
             )
         return False
 
@@ -653,11 +707,24 @@ class Xmrs(_LnkMixin):
         """
         Return `True` if the Xmrs is well-formed, `False` otherwise.
 
+        If the Xmrs was deserialized with deferred validation (e.g.,
+        with `validate='lazy'` in
+        :func:`delphin.mrs.simplemrs.loads`), the first call warns or
+        raises the :exc:`XmrsError` for an ill-formed Xmrs according
+        to the *errors* policy given at deserialization.
+
         See :meth:`validate`
         """
+        deferred = self._deferred_errors
+        if deferred is not None:
+            self._deferred_errors = None
         try:
             self.validate()
-        except XmrsError:
+        except XmrsError as ex:
+            if deferred == 'warn':
+                warn(str(ex), XmrsWarning)
+            elif deferred == 'strict':
+                raise
             return False
         return True
 
@@ -696,7 +763,7 @@ class Xmrs(_LnkMixin):
             labels[lbl].add(nid)
             iv = args.get(IVARG_ROLE)
             if iv is None:
-                errors.append('EP {nid} is missing an intrinsic variable.'
+                errors.append('EP {} is missing an intrinsic variable.'
                               .format(nid))
             if is_q:
                 if iv in bvs:
@@ -1193,18 +1260,20 @@ def _make_ivs(nodes, vgen, qs):
 def _bfs(g, start=None):
     if not g:
         return {start} if start is not None else set()
-    seen = set()
     if start is None:
         start = next(iter(g))
-    agenda = deque([start])
+    seen = {start}
+    agenda = [start]
     while agenda:
-        x = agenda.popleft()
-        if x not in seen:
-            seen.add(x)
-            agenda.extend(y for y in g.get(x, []) if y not in seen)
+        for y in g.get(agenda.pop(), ()):
+            if y not in seen:
+                seen.add(y)
+                agenda.append(y)
     return seen
 
-def _ivs_in_scope(nodeid, _eps, _vars, _hcons):
+def _ivs_in_scope(nodeid, _eps, _vars, _hcons, memo=None):
+    if memo is not None and nodeid in memo:
+        return memo[nodeid]
     ivs = set()
     args = _eps[nodeid][3]
     for role, val in args.items():
@@ -1215,6 +1284,72 @@ def _ivs_in_scope(nodeid, _eps, _vars, _hcons):
         elif var_sort(val) == HANDLESORT:
             if val in _hcons:
                 val = _hcons[val].lo
-            for conj_nid in _vars[val]['refs']['LBL']:
-                ivs.update(_ivs_in_scope(conj_nid, _eps, _vars, _hcons))
+            for conj_nid in _vars[val].nodeids('LBL'):
+                ivs.update(
+                    _ivs_in_scope(conj_nid, _eps, _vars, _hcons, memo))
+    if memo is not None:
+        memo[nodeid] = ivs
     return ivs
+
+
+class _XmrsVariable(object):
+    """
+    The properties of a variable and the structures that use it.
+
+    *props* is a tuple of (property, value) pairs shared with other
+    variables having the same properties (see :func:`_shared_props`),
+    *refs* is a flat tuple of alternating roles and the nodeids of the
+    EPs selecting the variable with those roles (`LBL` for labels),
+    *hcrefs* has a (nodeid, role, hi) triple for each argument that
+    is qeq to the variable, and *icrefs* has the ICONS whose right
+    variable is the variable. Tuples are used instead of lists and
+    dictionaries as they take a fraction of the memory.
+    """
+
+    __slots__ = ('props', 'refs', 'hcrefs', 'icrefs')
+
+    def __init__(self):
+        self.props = ()
+        self.refs = ()
+        self.hcrefs = ()
+        self.icrefs = ()
+
+    def has_role(self, role):
+        return role in self.refs[::2]
+
+    def nodeids(self, role):
+        refs = self.refs
+        return [refs[i + 1] for i in range(0, len(refs), 2)
+                if refs[i] == role]
+
+    def roles(self):
+        """Return a dictionary mapping roles to lists of nodeids."""
+        roles = {}
+        refs = self.refs
+        for i in range(0, len(refs), 2):
+            role = refs[i]
+            if role in roles:
+                roles[role].append(refs[i + 1])
+            else:
+                roles[role] = [refs[i + 1]]
+        return roles
+
+
+# property tuples are immutable, so equal ones are shared by all
+# variables; the cache is emptied when it grows too large
+_props_cache = {}
+_props_cache_limit = 100000
+
+
+def _shared_props(props):
+    props = tuple(props)
+    try:
+        shared = _props_cache.get(props)
+    except TypeError:  # e.g., lists instead of tuples for the pairs
+        props = tuple((prop, val) for prop, val in props)
+        shared = _props_cache.get(props)
+    if shared is None:
+        if len(_props_cache) >= _props_cache_limit:
+            _props_cache.clear()
+        shared = _props_cache[props] = props
+    return shared
@@ -35,15 +35,25 @@ expressions.
 
 from __future__ import unicode_literals
 
+import sys
 import re
 import io
+import os
+import multiprocessing
+import hashlib
+import pickle
+import tempfile
+import json
+from bisect import bisect_left
 from collections import deque, defaultdict
+from itertools import islice
 import textwrap
 import warnings
 
+from delphin.__about__ import __version__
 from delphin.exceptions import (TdlError, TdlParsingError, TdlWarning)
 from delphin.tfs import FeatureStructure
-from delphin.util import LookaheadIterator, deprecated
+from delphin.util import deprecated, stringtypes, replace_file
 
 str = type(u'')  # short-term fix for Python 2
 
@@ -79,8 +89,16 @@ class Term(object):
     Attributes:
         docstring (str): documentation string
     """
+    # A class-level default means terms without documentation never
+    # fill in their attribute dictionary, which CPython only allocates
+    # on first use. Term cannot use __slots__ instead, as its subclasses
+    # also inherit from str (TypeTerm) or a slotted FeatureStructure
+    # (AVM), and the instance layouts would conflict.
+    docstring = None
+
     def __init__(self, docstring=None):
-        self.docstring = docstring
+        if docstring is not None:
+            self.docstring = docstring
 
     def __repr__(self):
         return "<{} object at {}>".format(
@@ -483,6 +501,8 @@ class Conjunction(object):
     Args:
         terms (list): sequence of :class:`Term` objects
     """
+    __slots__ = ('_terms',)
+
     def __init__(self, terms=None):
         self._terms = []
         if terms is not None:
@@ -845,6 +865,254 @@ class FileInclude(object):
         self.basedir = basedir
 
 
+class Index(object):
+    """
+    Random access to the definitions of a TDL file.
+
+    The file is scanned once, without building any TDL objects, to
+    record the identifier and byte offsets of every type, instance,
+    and lexical-rule definition. A definition is read and parsed only
+    when it is requested, and the resulting object is not retained,
+    so the memory used by the index does not grow with the size of
+    the definitions. Type addenda (`:+`) are not indexed, and if an
+    identifier is defined more than once only the first definition
+    is available. The file should not change after it is indexed.
+
+    Args:
+        path (str): path to a TDL file
+        encoding (str): the encoding of the file (default: `"utf-8"`)
+    Example:
+        >>> lex = tdl.Index('erg/lexicon.tdl')
+        >>> len(lex)
+        40234
+        >>> lex['eucalyptus_n1']['SYNSEM.LKEYS.KEYREL.PRED']
+        <String object (_eucalyptus_n_1_rel) at 140625748595960>
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        self.path = path
+        self.encoding = encoding
+        # identifier -> (byte offset, byte length, line number)
+        self._offsets = {}
+        with io.open(path, 'rb') as fh:
+            s = fh.read().decode(encoding)
+        offsets = self._offsets
+        pos = bytepos = 0
+        for identifier, start, end, line_no in _scan_definitions(s):
+            bytepos += len(s[pos:start].encode(encoding))
+            length = len(s[start:end].encode(encoding))
+            if identifier not in offsets:
+                offsets[identifier] = (bytepos, length, line_no)
+            pos = end
+            bytepos += length
+
+    def __repr__(self):
+        return '<{} object ({}) at {}>'.format(
+            self.__class__.__name__, self.path, id(self))
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, identifier):
+        return identifier in self._offsets
+
+    def __iter__(self):
+        """Iterate over identifiers in file order."""
+        offsets = self._offsets
+        return iter(sorted(offsets, key=lambda ident: offsets[ident][0]))
+
+    def __getitem__(self, identifier):
+        """
+        Parse and return the definition of *identifier*.
+
+        Raises:
+            KeyError: when *identifier* is not indexed
+            :class:`TdlParsingError`: when the definition is invalid
+        """
+        offset, length, line_no = self._offsets[identifier]
+        with io.open(self.path, 'rb') as fh:
+            fh.seek(offset)
+            s = fh.read(length).decode(self.encoding)
+        tokens = _TokenStream(_lex(s, line_no))
+        try:
+            identifier = tokens.next()[1]
+            return _parse_tdl_definition(identifier, tokens)
+        except StopIteration:
+            raise TdlParsingError('Unexpected end of input.',
+                                  line_number=line_no)
+        except TdlParsingError as ex:
+            ex.filename = self.path
+            raise
+
+    def get(self, identifier, default=None):
+        """
+        Return the definition of *identifier*, or *default* if it is
+        not indexed.
+        """
+        if identifier in self._offsets:
+            return self[identifier]
+        return default
+
+    def keys(self):
+        """Return the list of identifiers in file order."""
+        return list(self)
+
+    def line_number(self, identifier):
+        """Return the line number where *identifier* is defined."""
+        return self._offsets[identifier][2]
+
+
+class FeatureIndex(object):
+    """
+    An inverted index from feature paths and values to definitions.
+
+    Each feature path and value pair given by
+    :meth:`TypeDefinition.features` (with `expand=True`) is mapped to
+    the identifiers of the definitions that have it, so definitions
+    with some value, value prefix, or value pattern on a path can be
+    found without walking the conjunctions of every definition.
+    Values are indexed by their string form: type identifiers are
+    downcased, strings and regular expressions appear without their
+    delimiters, and coreferences appear as their tag (e.g., `#x`).
+    Feature paths are case-insensitive. Type addenda contribute their
+    features to the type they modify. Results are lists of
+    identifiers in the order the definitions were indexed.
+
+    Args:
+        definitions: an iterable of :class:`TypeDefinition` objects
+            or of events from :func:`iterparse` or
+            :func:`load_grammar`; other objects and events are ignored
+    Example:
+        >>> lex = tdl.FeatureIndex(tdl.iterparse('erg/lexicon.tdl'))
+        >>> lex.prefix('SYNSEM.LKEYS.KEYREL.PRED', '_eucalyptus_')
+        ['eucalyptus_n1']
+        >>> lex.search('SYNSEM.LKEYS.KEYREL.PRED', '_n_')[:3]
+        ['a_bit_n1', 'a_couple_n1', 'a_few_n1']
+        >>> lex.write('lexicon.fidx')
+        >>> lex = tdl.FeatureIndex.from_file('lexicon.fidx')
+    """
+
+    def __init__(self, definitions=None):
+        self._identifiers = []
+        # path -> (sorted values, identifier positions for each value)
+        self._paths = {}
+        positions = {}
+        entries = defaultdict(lambda: defaultdict(set))
+        for obj in (definitions or []):
+            if isinstance(obj, tuple):
+                obj = obj[-2]  # from iterparse() or load_grammar()
+            if not isinstance(obj, TypeDefinition):
+                continue
+            identifier = obj.identifier
+            if identifier not in positions:
+                positions[identifier] = len(self._identifiers)
+                self._identifiers.append(identifier)
+            pos = positions[identifier]
+            for path, value in obj.features(expand=True):
+                value = _index_value(value)
+                if value is not None:
+                    entries[path.upper()][value].add(pos)
+        for path, values in entries.items():
+            keys = sorted(values)
+            self._paths[path] = (keys, [sorted(values[key]) for key in keys])
+
+    def __repr__(self):
+        return '<{} object ({} definitions) at {}>'.format(
+            self.__class__.__name__, len(self._identifiers), id(self))
+
+    def __len__(self):
+        return len(self._identifiers)
+
+    def __contains__(self, path):
+        return path.upper() in self._paths
+
+    @classmethod
+    def from_file(cls, path, encoding='utf-8'):
+        """
+        Load an index from the index file at *path*.
+        """
+        with io.open(path, encoding=encoding) as f:
+            data = json.load(f)
+        index = cls()
+        index._identifiers = data['identifiers']
+        index._paths = dict(
+            (featpath, (keys, postings))
+            for featpath, keys, postings in data['paths'])
+        return index
+
+    def write(self, path, encoding='utf-8'):
+        """
+        Write the index to the index file at *path*.
+        """
+        data = {'identifiers': self._identifiers,
+                'paths': [[featpath, keys, postings]
+                          for featpath, (keys, postings)
+                          in sorted(self._paths.items())]}
+        with io.open(path, 'w', encoding=encoding) as f:
+            f.write(str(json.dumps(data)))
+
+    def paths(self):
+        """Return the sorted list of indexed feature paths."""
+        return sorted(self._paths)
+
+    def values(self, path):
+        """Return the sorted list of values indexed for *path*."""
+        return list(self._paths.get(path.upper(), ([], []))[0])
+
+    def lookup(self, path, value):
+        """
+        Return the definitions whose value on *path* is *value*.
+
+        Example:
+            >>> lex.lookup('SYNSEM.LKEYS.KEYREL.PRED', '_eucalyptus_n_1_rel')
+            ['eucalyptus_n1']
+        """
+        keys, postings = self._paths.get(path.upper(), ([], []))
+        i = bisect_left(keys, value)
+        if i < len(keys) and keys[i] == value:
+            return self._results([postings[i]])
+        return []
+
+    def prefix(self, path, prefix):
+        """
+        Return the definitions with a value on *path* starting with
+        *prefix*.
+        """
+        keys, postings = self._paths.get(path.upper(), ([], []))
+        start = i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            i += 1
+        return self._results(postings[start:i])
+
+    def search(self, path, pattern, flags=0):
+        """
+        Return the definitions with a value on *path* matching the
+        regular expression *pattern* anywhere (see :func:`re.search`).
+        """
+        keys, postings = self._paths.get(path.upper(), ([], []))
+        regex = re.compile(pattern, flags)
+        return self._results([postings[i] for i, key in enumerate(keys)
+                              if regex.search(key)])
+
+    def _results(self, postings):
+        if len(postings) == 1:
+            positions = postings[0]
+        else:
+            positions = sorted(set(pos for ps in postings for pos in ps))
+        identifiers = self._identifiers
+        return [identifiers[pos] for pos in positions]
+
+
+def _index_value(value):
+    if isinstance(value, TypeIdentifier):
+        return value.lower()
+    elif isinstance(value, TypeTerm):
+        return value[:]  # plain string without the subclass
+    elif isinstance(value, Coreference) and value.identifier is not None:
+        return '#' + value.identifier
+    return None
+
+
 # Old classes
 
 class TdlDefinition(FeatureStructure):
@@ -1035,26 +1303,63 @@ _tdl_lex_re = re.compile(
 
 # Parsing helper functions
 
-def _is_comment(data):
-    """helper function for filtering out comments"""
-    return 2 <= data[0] <= 3
+class _TokenStream(object):
+    """
+    Buffered lookahead over the tokens yielded by _lex().
+
+    Comments inside of definitions are already removed by the lexer,
+    so unlike :class:`delphin.util.LookaheadIterator` no tokens need
+    to be skipped when peeking. StopIteration is raised at the end of
+    the tokens.
+
+    The stream also holds the :class:`TypeIdentifier` objects created
+    while parsing so undocumented occurrences of the same identifier
+    can share a single object.
+    """
+    __slots__ = ('_tokens', '_buffer', 'types')
+
+    def __init__(self, tokens):
+        self._tokens = tokens
+        self._buffer = deque()
+        self.types = {}
+
+    def _fill(self):
+        n = len(self._buffer)
+        self._buffer.extend(islice(self._tokens, 1024))
+        if len(self._buffer) == n:
+            raise StopIteration
+
+    def next(self):
+        try:
+            return self._buffer.popleft()
+        except IndexError:
+            self._fill()
+            return self._buffer.popleft()
+
+    def peek(self, n=0):
+        buffer = self._buffer
+        while len(buffer) <= n:
+            self._fill()
+        return buffer[n]
 
 
 def _peek(tokens, n=0):
-    """peek and drop comments"""
-    return tokens.peek(n=n, skip=_is_comment, drop=True)
+    """peek at the nth next token"""
+    return tokens.peek(n)
 
 
 def _next(tokens):
-    """pop the next token, dropping comments"""
-    return tokens.next(skip=_is_comment)
+    """pop the next token"""
+    return tokens.next()
 
 
 def _shift(tokens):
     """pop the next token, then peek the gid of the following"""
-    after = tokens.peek(n=1, skip=_is_comment, drop=True)
-    tok = tokens._buffer.popleft()
-    return tok[0], tok[1], tok[2], after[0]
+    buffer = tokens._buffer
+    while len(buffer) < 2:
+        tokens._fill()
+    tok = buffer.popleft()
+    return tok[0], tok[1], tok[2], buffer[0][0]
 
 
 def _accumulate(lexitems):
@@ -1111,69 +1416,142 @@ def _accumulate(lexitems):
         yield data
 
 
-def _lex(stream):
+# the lexer scans the whole buffer at once, so the letter-set pattern's
+# $ must match at the end of each line, not only at the end of the
+# buffer, and newlines are matched (as gid 31) to count lines; other
+# whitespace is consumed before each token so it is not retried
+# against every pattern
+_tdl_buffer_lex_re = re.compile(
+    r'[^\S\n]*(?:' + _tdl_lex_re.pattern + r'|(\n))',
+    flags=re.VERBOSE|re.UNICODE|re.MULTILINE)
+_docstring_end_re = re.compile(
+    r"""((?:[^"\\]|\\.|"(?!""))*)\"\"\"""", flags=re.DOTALL|re.UNICODE)
+_block_comment_end_re = re.compile(
+    r"""((?:[^|\\]|\\.|\|(?!\#))*)\|\#""", flags=re.DOTALL|re.UNICODE)
+# strings, regexes, letter-sets, and affix patterns may contain newlines
+_lex_multiline_gids = frozenset([4, 6, 20, 22])
+
+
+def _lex(s, line_no=1):
     """
-    Lex the input stream according to _tdl_lex_re.
+    Lex the string *s* according to _tdl_lex_re.
+
+    The whole string is scanned at once and comments that occur inside
+    of a definition or other statement are removed, so the parser only
+    encounters comments between statements. Line numbers are counted
+    from *line_no*.
 
     Yields
         (gid, token, line_number)
     """
-    lines = enumerate(stream, 1)
-    line_no = pos = 0
-    try:
-        while True:
-            if pos == 0:
-                line_no, line = next(lines)
-            matches = _tdl_lex_re.finditer(line, pos)
-            pos = 0  # reset; only used for multiline patterns
-            for m in matches:
-                gid = m.lastindex
-                if gid <= 2:  # potentially multiline patterns
-                    if gid == 1:  # docstring
-                        s, start_line_no, line_no, line, pos = _bounded(
-                            '"""', '"""', line, m.end(), line_no, lines)
-                    elif gid == 2:  # comment
-                        s, start_line_no, line_no, line, pos = _bounded(
-                            '#|', '|#', line, m.end(), line_no, lines)
-                    yield (gid, s, line_no)
-                    break
-                elif gid == 30:
-                    raise TdlParsingError(
-                        ('Syntax error:\n  {}\n {}^'
-                         .format(line, ' ' * m.start())),
-                        line_number=line_no)
+    depth = 0  # nesting level of AVMs and lists
+    in_statement = False
+    matches = _tdl_buffer_lex_re.finditer(s)
+    while matches is not None:
+        for m in matches:
+            gid = m.lastindex
+            if gid == 31:  # newline
+                line_no += 1
+            elif 13 <= gid <= 18:  # AVM or list open or close
+                depth += 1 if gid <= 15 else -1
+                in_statement = True
+                yield (gid, m.group(gid), line_no)
+            elif gid == 10:  # dot; ends a statement outside AVMs and lists
+                in_statement = depth != 0
+                yield (gid, '.', line_no)
+            elif gid <= 2:  # multiline docstring or comment
+                if gid == 1:
+                    end = _docstring_end_re.match(s, m.end())
+                    pattern = 'docstring'
                 else:
-                    # token = None
-                    # if not (6 < gid < 20):
-                    #     token = m.group(gid)
-                    token = m.group(gid)
-                    yield (gid, token, line_no)
-    except StopIteration:
-        pass
+                    end = _block_comment_end_re.match(s, m.end())
+                    pattern = 'block comment'
+                if end is None:
+                    raise TdlParsingError('Unterminated {}'.format(pattern),
+                                          line_number=line_no)
+                line_no += s.count('\n', m.start(), end.end())
+                if gid == 1 or not in_statement:
+                    yield (gid, end.group(1), line_no)
+                matches = _tdl_buffer_lex_re.finditer(s, end.end())
+                break
+            elif gid == 3:  # line comment
+                if not in_statement:
+                    yield (gid, m.group(3), line_no)
+            elif gid == 30:
+                start = m.start(gid)
+                linestart = s.rfind('\n', 0, start) + 1
+                lineend = s.find('\n', start)
+                line = s[linestart:] if lineend < 0 else s[linestart:lineend+1]
+                raise TdlParsingError(
+                    ('Syntax error:\n  {}\n {}^'
+                     .format(line, ' ' * (start - linestart))),
+                    line_number=line_no)
+            else:
+                # letter-sets and wild-cards are statements themselves
+                in_statement = gid != 20
+                yield (gid, m.group(gid), line_no)
+                if gid in _lex_multiline_gids:
+                    line_no += s.count('\n', m.start(), m.end())
+        else:
+            matches = None
 
 
-def _bounded(p1, p2, line, pos, line_no, lines):
-    """Collect the contents of a bounded multiline string"""
-    substrings = []
-    start_line_no = line_no
-    end = pos
-    while not line.startswith(p2, end):
-        if line[end] == '\\':
-            end += 2
+def _scan_definitions(s):
+    """
+    Find the definitions in the string *s* without parsing them.
+
+    Only the structure needed to find where definitions start and end
+    is tracked: nesting depth, multiline docstrings and comments, and
+    the dots that terminate statements. Type addenda are skipped.
+
+    Yields
+        (identifier, start, end, line_number)
+    """
+    line_no = 1
+    depth = 0
+    in_statement = False
+    candidate = None  # an identifier that may begin a definition
+    current = None  # the definition being scanned
+    matches = _tdl_buffer_lex_re.finditer(s)
+    while matches is not None:
+        for m in matches:
+            gid = m.lastindex
+            if gid == 31:  # newline
+                line_no += 1
+                continue
+            elif gid <= 2:  # multiline docstring or comment
+                if gid == 1:
+                    end = _docstring_end_re.match(s, m.end())
+                else:
+                    end = _block_comment_end_re.match(s, m.end())
+                if end is None:
+                    raise TdlParsingError('Unterminated docstring or comment',
+                                          line_number=line_no)
+                line_no += s.count('\n', m.start(), end.end())
+                matches = _tdl_buffer_lex_re.finditer(s, end.end())
+                break
+            elif gid == 3:  # line comment
+                continue
+            if candidate is not None:
+                if gid == 7:
+                    current = candidate
+                candidate = None
+            if gid == 10:
+                if depth == 0:
+                    if current is not None:
+                        yield (current[0], current[1], m.end(), current[2])
+                        current = None
+                    in_statement = False
+                continue
+            elif 13 <= gid <= 18:
+                depth += 1 if gid <= 15 else -1
+            elif gid == 24 and not in_statement:
+                candidate = (m.group(24), m.start(24), line_no)
+            elif gid in _lex_multiline_gids:
+                line_no += s.count('\n', m.start(), m.end())
+            in_statement = gid != 20
         else:
-            end += 1
-        if end >= len(line):
-            substrings.append(line[pos:])
-            try:
-                line_no, line = next(lines)
-            except StopIteration:
-                pattern = 'docstring' if p1 == '"""' else 'block comment'
-                raise TdlParsingError('Unterminated {}'.format(pattern),
-                                      line_number=start_line_no)
-            pos = end = 0
-    substrings.append(line[pos:end])
-    end += len(p2)
-    return ''.join(substrings), start_line_no, line_no, line, end
+            matches = None
 
 
 # Parsing functions
@@ -1216,8 +1594,164 @@ def iterparse(source, encoding='utf-8'):
                 yield event
 
 
+def load_grammar(source, jobs=None, encoding='utf-8', cache=None):
+    """
+    Parse the TDL files of a grammar and yield parse events.
+
+    Starting from the file or files in *source*, each file is parsed
+    and its `:include` directives (:class:`FileInclude` objects) are
+    followed. Files are parsed in a pool of *jobs* worker processes,
+    and included files are scheduled as soon as the file including
+    them has been parsed, but the events are yielded in document
+    order: the events of an included file directly follow the
+    `"FileInclude"` event that included it. Include paths are
+    relative to the directory of the including file, and a `.tdl`
+    extension is added if the path does not name an existing file.
+    Each file is loaded at most once, even if it is included several
+    times.
+
+    Events are those of :func:`iterparse` with the source filename
+    prepended. Note that warnings issued while parsing are emitted by
+    the worker processes.
+
+    If *cache* is the path of a directory, the parse events of each
+    file are stored there and reused while the file is unchanged. The
+    cached events of a file are keyed on a hash of the file's
+    contents, the encoding, and the versions of PyDelphin and Python,
+    so a changed file is parsed again and stale entries are simply
+    never read. The directory is created if it does not exist, and it
+    may be shared by several grammars.
+
+    Args:
+        source (str, list): a filename or list of filenames of the
+            top-level TDL files of a grammar
+        jobs (int): number of worker processes (default: the number
+            of CPUs); if `1`, files are parsed in the current process
+        encoding (str): the encoding of the files (default:
+            `"utf-8"`)
+        cache (str): directory of cached parse events (default:
+            `None`, so nothing is cached)
+    Yields:
+        `(filename, event, object, lineno)` tuples
+    Example:
+        >>> types = {}
+        >>> for fn, event, obj, lineno in tdl.load_grammar('erg/english.tdl'):
+        ...     if event == 'TypeDefinition':
+        ...         types[obj.identifier] = fn
+        ...
+        >>> types['eucalyptus_n1']
+        'erg/lexicon.tdl'
+    """
+    if isinstance(source, stringtypes):
+        source = [source]
+    if cache is not None and not os.path.isdir(cache):
+        os.makedirs(cache)
+    pool = None
+    if jobs != 1:
+        pool = multiprocessing.Pool(jobs)
+    pending = {}
+    loaded = set()
+
+    def submit(path):
+        key = os.path.realpath(path)
+        if key in loaded:
+            return False
+        loaded.add(key)
+        args = (path, encoding, cache)
+        if pool is None:
+            pending[path] = lambda: _load_tdl_file(args)
+        else:
+            pending[path] = pool.apply_async(_load_tdl_file, (args,)).get
+        return True
+
+    def emit(path):
+        events = pending.pop(path)()
+        # schedule all includes before descending into any of them
+        includes = []
+        for event, obj, _ in events:
+            incpath = None
+            if event == 'FileInclude':
+                incpath = _include_path(path, obj.path)
+                if not submit(incpath):
+                    incpath = None
+            includes.append(incpath)
+        for (event, obj, lineno), incpath in zip(events, includes):
+            yield (path, event, obj, lineno)
+            if incpath is not None:
+                for item in emit(incpath):
+                    yield item
+
+    try:
+        toplevel = [path for path in source if submit(path)]
+        for path in toplevel:
+            for item in emit(path):
+                yield item
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+# part of the cache key; increment it whenever a class that is pickled
+# in the cache (terms, definitions, FeatureStructure, etc.) changes
+_CACHE_FORMAT = 1
+
+
+def _load_tdl_file(args):
+    path, encoding, cache = args
+    if cache is None:
+        return list(iterparse(path, encoding=encoding))
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    key = hashlib.sha1(
+        '{}\0{}\0{}.{}\0{}\0'.format(
+            __version__, _CACHE_FORMAT,
+            sys.version_info[0], sys.version_info[1], encoding
+        ).encode('utf-8'))
+    key.update(data)
+    cachepath = os.path.join(cache, key.hexdigest() + '.pickle')
+    try:
+        with open(cachepath, 'rb') as fh:
+            return pickle.load(fh)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError,
+            AttributeError, ImportError):
+        pass  # not cached or unreadable; parse it again
+    # parse the bytes that were hashed, not the file, which may change
+    buf = io.BytesIO(data)
+    buf.name = path
+    events = list(iterparse(io.TextIOWrapper(buf, encoding=encoding)))
+    _write_cache(cachepath, events)
+    return events
+
+
+def _write_cache(path, events):
+    dirname, basename = os.path.split(path)
+    tmppath = None
+    try:
+        fd, tmppath = tempfile.mkstemp(prefix='.' + basename + '.',
+                                       dir=dirname)
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(events, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        replace_file(tmppath, path)
+    except Exception:
+        # a failed cache write (e.g., to a read-only cache directory
+        # or of an object that cannot be pickled, which may raise
+        # nearly anything) only costs a parse next time
+        pass
+    finally:
+        if tmppath is not None and os.path.exists(tmppath):
+            os.remove(tmppath)
+
+
+def _include_path(filename, path):
+    path = os.path.join(os.path.dirname(filename), path)
+    if not os.path.isfile(path) and not path.lower().endswith('.tdl'):
+        path += '.tdl'
+    return path
+
+
 def _parse2(f):
-    tokens = LookaheadIterator(_lex(f))
+    tokens = _TokenStream(_lex(f.read()))
     try:
         for event in _parse_tdl(tokens):
             yield event
@@ -1396,7 +1930,12 @@ def _parse_tdl_term(tokens):
     elif gid == 19:  # coreference
         term = Coreference(token, docstring=doc)
     elif gid == 24:  # identifier
-        term = TypeIdentifier(token, docstring=doc)
+        if doc is None:
+            term = tokens.types.get(token)
+            if term is None:
+                term = tokens.types[token] = TypeIdentifier(token)
+        else:
+            term = TypeIdentifier(token, docstring=doc)
     else:
         raise TdlParsingError('Expected a TDL conjunction term.',
                               line_number=line_no)
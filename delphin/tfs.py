@@ -15,6 +15,32 @@ compatibility.
 
 from __future__ import unicode_literals
 
+import sys
+
+from delphin.util import stringtypes
+
+# dicts preserve insertion order from Python 3.7, so a separate list
+# of features is only kept for older versions
+_ordered_dicts = sys.version_info >= (3, 7)
+
+# map raw feature names to shared, upper-cased feature names so many
+# feature structures don't each hold a copy of the same string; the
+# map is emptied when it grows too large
+_feature_names = {}
+_feature_names_limit = 100000
+
+
+def _feature_name(name):
+    try:
+        return _feature_names[name]
+    except KeyError:
+        if len(_feature_names) >= _feature_names_limit:
+            _feature_names.clear()
+        upper = name.upper()
+        upper = _feature_names.setdefault(upper, upper)
+        _feature_names[name] = upper
+        return upper
+
 
 class FeatureStructure(object):
     """
@@ -32,7 +58,7 @@ class FeatureStructure(object):
 
     def __init__(self, featvals=None):
         self._avm = {}
-        self._feats = []
+        self._feats = None if _ordered_dicts else []
         if isinstance(featvals, dict):
             featvals = featvals.items()
         for feat, val in list(featvals or []):
@@ -57,8 +83,8 @@ class FeatureStructure(object):
     def __setitem__(self, key, val):
         avm = self._avm
         subkeys = key.split('.', 1)
-        subkey = subkeys[0].upper()
-        if subkey not in avm:
+        subkey = _feature_name(subkeys[0])
+        if subkey not in avm and self._feats is not None:
             self._feats.append(subkey)
         if len(subkeys) == 1:
             avm[subkey] = val
@@ -71,7 +97,7 @@ class FeatureStructure(object):
 
     def __getitem__(self, key):
         subkeys = key.split('.', 1)
-        subkey = subkeys[0].upper()
+        subkey = _feature_names.get(subkeys[0]) or subkeys[0].upper()
         val = self._avm[subkey]
         if len(subkeys) == 2:
             val = val[subkeys[1]]
@@ -79,7 +105,7 @@ class FeatureStructure(object):
 
     def __contains__(self, key):
         subkeys = key.split('.', 1)
-        subkey = subkeys[0].upper()
+        subkey = _feature_names.get(subkeys[0]) or subkeys[0].upper()
         if subkey in self._avm:
             if len(subkeys) == 2:
                 return subkeys[1] in self._avm[subkey]
@@ -121,7 +147,8 @@ class FeatureStructure(object):
         """
         fs = []
         if self._avm is not None:
-            if len(self._feats) == len(self._avm):
+            if (self._feats is not None
+                    and len(self._feats) == len(self._avm)):
                 feats = self._feats
             else:
                 feats = list(self._avm)
@@ -184,8 +211,16 @@ class TypeHierarchy(object):
     Type hierarchies have certain properties, such as a unique top node,
     multiple inheritance, and unique greatest-lower-bound (glb) types.
 
-    Note:
-        Checks for unique glbs is not yet implemented.
+    Queries of subsumption, compatibility, ancestors, and descendants
+    are answered from a compiled form of the hierarchy, where each
+    type's ancestors and descendants are encoded as bit vectors (plain
+    Python integers with one bit per type). The compiled form is built
+    on the first query and is discarded when a type is added.
+
+    Types are not required to have unique glbs when they are added,
+    but :meth:`glb_closure` adds the glb types that are missing, as is
+    done by grammar compilers.
+
     Args:
         top (str): unique top type
         hierarchy (dict): mapping of `{child: [parents]}`
@@ -193,70 +228,454 @@ class TypeHierarchy(object):
     def __init__(self, top, hierarchy=None):
         self._top = top
         self._hier = {}
+        self._order = []  # types in insertion order; parents come first
+        self._bits = None  # compiled bit vectors; see _compile()
         if hierarchy is None:
             self[top] = []
         elif hierarchy.get(top, False):
             raise ValueError('top type cannot have supertypes')
         else:
-            hierarchy[top] = []
-            loerarchy = {}  # type -> children
-            for child, parents in hierarchy.items():
+            self._build(hierarchy)
+
+    @classmethod
+    def from_tdl(cls, source, top='*top*', encoding='utf-8'):
+        """
+        Build a type hierarchy from the type definitions in TDL files.
+
+        The files are parsed with :func:`delphin.tdl.iterparse` and
+        only the supertypes of each :class:`~delphin.tdl.TypeDefinition`
+        and :class:`~delphin.tdl.TypeAddendum` are kept, so the
+        feature structures of the definitions are discarded as soon as
+        they are parsed. Definitions in `:instance` environments are
+        skipped, and `:include` directives are not followed. As TDL
+        identifiers are case-insensitive, type names are downcased.
+
+        Args:
+            source (str, list): a TDL filename or list of filenames
+            top (str): the top type, which need not be defined
+                (default: `"*top*"`)
+            encoding (str): the encoding of the files (default:
+                `"utf-8"`)
+        Returns:
+            a :class:`TypeHierarchy`
+        Raises:
+            ValueError: when a type is defined twice, an addendum is
+                for an undefined type, or the hierarchy is invalid
+        Example:
+            >>> th = TypeHierarchy.from_tdl(['erg/fundamentals.tdl',
+            ...                              'erg/lextypes.tdl'])
+            >>> th.subsumes('sign', 'n_-_c_le')
+            True
+        """
+        from delphin import tdl  # delphin.tdl imports this module
+        if isinstance(source, stringtypes):
+            source = [source]
+
+        def supertypes(definition):
+            # strings and regexes in the conjunction are not supertypes
+            return [t.lower() for t in definition.supertypes
+                    if isinstance(t, tdl.TypeIdentifier)]
+
+        top = top.lower()
+        hierarchy = {}
+        addenda = []
+        for filename in source:
+            instance = []  # whether each open environment is :instance
+            for event, obj, _ in tdl.iterparse(filename, encoding=encoding):
+                if event == 'BeginEnvironment':
+                    instance.append(
+                        isinstance(obj, tdl.InstanceEnvironment)
+                        or (bool(instance) and instance[-1]))
+                elif event == 'EndEnvironment':
+                    instance.pop()
+                elif instance and instance[-1]:
+                    continue
+                elif event == 'TypeAddendum':
+                    addenda.append((obj.identifier.lower(),
+                                    supertypes(obj)))
+                elif isinstance(obj, tdl.TypeDefinition):
+                    typename = obj.identifier.lower()
+                    if typename in hierarchy:
+                        raise ValueError(
+                            'type already in hierarchy: ' + typename)
+                    hierarchy[typename] = supertypes(obj)
+        for typename, supertypes in addenda:
+            if typename not in hierarchy:
+                raise ValueError(
+                    'addendum for undefined type: ' + typename)
+            parents = hierarchy[typename]
+            parents.extend(t for t in supertypes if t not in parents)
+        return cls(top, hierarchy)
+
+    def _build(self, hierarchy):
+        """
+        Add the types in *hierarchy* in topological order.
+
+        Each type is added when its last parent has been added, so
+        construction is linear in the number of types and parents, and
+        redundant parents are found afterwards with the compiled bit
+        vectors instead of by a search for each type.
+        """
+        top = self._top
+        remaining = {}  # type -> number of parents not yet added
+        loerarchy = {}  # type -> children
+        for child, parents in hierarchy.items():
+            if child != top:
+                remaining[child] = len(parents)
                 for parent in parents:
                     loerarchy.setdefault(parent, []).append(child)
-            agenda = [top]
-            th = self._hier  # to reduce lookups in the loop
-            while agenda:
-                typename = agenda.pop()
-                self[typename] = hierarchy[typename]
-                del hierarchy[typename]
-                for child in loerarchy.get(typename, []):
-                    if all(parent in th for parent in hierarchy[child]):
-                        agenda.append(child)
-            if hierarchy:
-                raise ValueError(
-                    'disconnected or cyclic hierarchy; remaining: {}'
-                    .format(', '.join(hierarchy)))
+        agenda = [top]
+        while agenda:
+            typename = agenda.pop()
+            parents = [] if typename == top else hierarchy[typename]
+            self._add(typename, parents)
+            for child in loerarchy.get(typename, []):
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    agenda.append(child)
+        if len(self._hier) <= len(remaining):
+            raise ValueError(
+                'disconnected or cyclic hierarchy; remaining: {}'
+                .format(', '.join(t for t in remaining if t not in self._hier)))
+        # only types with multiple parents can have redundant ones
+        multiple = [self._hier[typename][0] for typename in self._order
+                    if len(self._hier[typename][0]) > 1]
+        if multiple:
+            index, ancestors, _ = self._compile()
+        for parents in multiple:
+            above = 0
+            for parent in parents:
+                above |= ancestors[parent] & ~(1 << index[parent])
+            redundant = [p for p in parents if (above >> index[p]) & 1]
+            if redundant:
+                raise ValueError('redundant parents: {}'
+                                 .format(', '.join(sorted(redundant))))
 
     def __setitem__(self, typename, parents):
         if typename in self._hier:
             raise ValueError('type already in hierarchy: ' + typename)
-        ancestors = set()
         for parent in parents:
             if parent not in self._hier:
                 raise ValueError('parent not in hierarchy: ' + parent)
-            ancestors.update(self.ancestors(parent))
+        # a search instead of ancestors() so the hierarchy is not
+        # recompiled for every type that is added
+        ancestors = set()
+        agenda = [grandparent for parent in parents
+                  for grandparent in self._hier[parent][0]]
+        while agenda:
+            ancestor = agenda.pop()
+            if ancestor not in ancestors:
+                ancestors.add(ancestor)
+                agenda.extend(self._hier[ancestor][0])
         redundant = ancestors.intersection(parents)
         if redundant:
             raise ValueError('redundant parents: {}'
                              .format(', '.join(sorted(redundant))))
-        self._hier[typename] = (parents, [])
+        self._add(typename, parents)
+
+    def _add(self, typename, parents):
+        self._hier[typename] = (list(parents), [])
+        self._order.append(typename)
+        self._bits = None
         for parent in parents:
             self._hier[parent][1].append(typename)
 
+    def __contains__(self, typename):
+        return typename in self._hier
+
     # def __getitem__(self, typename):
     #     return self._hier[typename]
 
+    def _compile(self):
+        """
+        Encode the ancestors and descendants of each type as integers.
+
+        Each type is assigned a bit by its position in the insertion
+        order, which is a topological order, so the ancestor and
+        descendant vectors (each including the type's own bit) are
+        built in one pass each.
+        """
+        hier = self._hier
+        order = self._order
+        index = dict((typename, i) for i, typename in enumerate(order))
+        ancestors = {}
+        for typename in order:
+            bits = 1 << index[typename]
+            for parent in hier[typename][0]:
+                bits |= ancestors[parent]
+            ancestors[typename] = bits
+        descendants = {}
+        for typename in reversed(order):
+            bits = 1 << index[typename]
+            for child in hier[typename][1]:
+                bits |= descendants[child]
+            descendants[typename] = bits
+        self._bits = (index, ancestors, descendants)
+        return self._bits
+
+    def _types(self, bits):
+        """Return the types whose bits are set in *bits*."""
+        order = self._order
+        # searching the binary string is much faster than shifting
+        # or masking large integers one bit at a time
+        digits = bin(bits)[:1:-1]  # least-significant bit first
+        i = digits.find('1')
+        types = []
+        while i >= 0:
+            types.append(order[i])
+            i = digits.find('1', i + 1)
+        return types
+
     def ancestors(self, typename):
         """Return the ancestor types of *typename*."""
-        xs = []
-        for parent in self._hier[typename][0]:
-            xs.append(parent)
-            xs.extend(self.ancestors(parent))
-        return xs
+        index, ancestors, _ = self._bits or self._compile()
+        return self._types(ancestors[typename] & ~(1 << index[typename]))
 
     def descendants(self, typename):
         """Return the descendant types of *typename*."""
-        xs = []
-        for child in self._hier[typename][1]:
-            xs.append(child)
-            xs.extend(self.descendants(child))
-        return xs
+        index, _, descendants = self._bits or self._compile()
+        return self._types(descendants[typename] & ~(1 << index[typename]))
 
     def subsumes(self, a, b):
         """Return `True` if type *a* subsumes type *b*."""
-        return a == b or b in self.descendants(a)
+        if a == b:
+            return True
+        index, ancestors, _ = self._bits or self._compile()
+        return bool((ancestors[b] >> index[a]) & 1)
 
     def compatible(self, a, b):
         """Return `True` if type *a* is compatible with type *b*."""
-        return len(set([a] + self.descendants(a))
-                   .intersection([b] + self.descendants(b))) > 0
+        _, _, descendants = self._bits or self._compile()
+        return (descendants[a] & descendants[b]) != 0
+
+    def glb(self, a, b):
+        """
+        Return the greatest lower bound of types *a* and *b*.
+
+        Returns:
+            the glb type, or `None` if *a* and *b* are not compatible
+        Raises:
+            ValueError: when *a* and *b* do not have a unique glb
+        Example:
+            >>> th = TypeHierarchy('*top*', {'a': ['*top*'],
+            ...                              'b': ['*top*'],
+            ...                              'c': ['a', 'b']})
+            >>> th.glb('a', 'b')
+            'c'
+        """
+        _, _, descendants = self._bits or self._compile()
+        common = descendants[a] & descendants[b]
+        if not common:
+            return None
+        # the glb precedes its descendants in the insertion order, so
+        # if there is one, it has the lowest bit of the common
+        # descendants
+        glb = self._order[(common & -common).bit_length() - 1]
+        if descendants[glb] != common:
+            raise ValueError(
+                'no unique glb for {} and {}'.format(a, b))
+        return glb
+
+    def glb_closure(self, prefix='glbtype'):
+        """
+        Add types so that all compatible types have a unique glb.
+
+        For each pair of compatible types whose common descendants do
+        not have a unique greatest element, a new type is inserted
+        above those descendants and below all types subsuming them,
+        and the process is repeated until no such pairs remain. Only
+        pairs of types that share a descendant with more than one
+        parent can lack a unique glb, so other pairs are not checked.
+
+        Args:
+            prefix (str): prefix of the names of new types, which are
+                numbered from 1 (default: `"glbtype"`)
+        Returns:
+            the list of new types in the order they were added
+        Example:
+            >>> th = TypeHierarchy('*top*', {'a': ['*top*'],
+            ...                              'b': ['*top*'],
+            ...                              'c': ['a', 'b'],
+            ...                              'd': ['a', 'b']})
+            >>> th.glb_closure()
+            ['glbtype1']
+            >>> th.glb('a', 'b')
+            'glbtype1'
+        """
+        added = []
+        n = 0
+        new = None
+        while True:
+            codes = self._missing_glbs(new)
+            if not codes:
+                break
+            names = []
+            for code in codes:
+                n += 1
+                while '{}{}'.format(prefix, n) in self._hier:
+                    n += 1
+                names.append('{}{}'.format(prefix, n))
+            self._insert_glbs(names, codes)
+            added.extend(names)
+            new = names
+        return added
+
+    def _missing_glbs(self, types=None):
+        """
+        Return the common descendants of compatible types lacking a
+        unique glb, as bit vectors.
+
+        If *types* is given, only pairs including one of *types* are
+        checked. Adding types does not remove existing unique glbs, so
+        after types are added only pairs including them need to be
+        checked again.
+        """
+        index, ancestors, descendants = self._bits or self._compile()
+        order = self._order
+        hier = self._hier
+        # the maximal common descendants of incomparable types always
+        # have multiple parents, so only their ancestors are checked;
+        # also, a type with one child has the same common descendants
+        # with other types as its child does, so only types with
+        # multiple children are checked
+        multiple = branching = 0
+        for typename in order:
+            parents, children = hier[typename]
+            if len(parents) > 1:
+                multiple |= 1 << index[typename]
+            if len(children) > 1:
+                branching |= 1 << index[typename]
+        candidates = 0
+        for typename in self._types(multiple):
+            candidates |= ancestors[typename]
+        candidates &= branching
+        if types is None:
+            types = self._types(candidates)
+        else:
+            types = [t for t in types if (candidates >> index[t]) & 1]
+        missing = set()
+        for a in types:
+            desc_a = descendants[a]
+            partners = 0
+            for m in self._types(desc_a & multiple):
+                partners |= ancestors[m]
+            partners &= candidates & ~(ancestors[a] | desc_a)
+            for b in self._types(partners):
+                common = desc_a & descendants[b]
+                glb = order[(common & -common).bit_length() - 1]
+                if descendants[glb] != common:
+                    missing.add(common)
+        return sorted(missing)
+
+    def _insert_glbs(self, names, codes):
+        """
+        Insert types *names* whose descendants are given by *codes*
+        between existing types, then restore the insertion order.
+        """
+        index, ancestors, descendants = self._bits or self._compile()
+        hier = self._hier
+        codeof = dict(descendants)
+        new = list(zip(names, codes))
+        codeof.update(new)
+        sizes = dict((name, bin(code).count('1')) for name, code in new)
+        links = []
+        for name, code in new:
+            # codes are closed downward, so the existing children are
+            # the maximal members and the existing parents are the
+            # minimal types above every member
+            above = -1
+            children = []
+            for t in self._types(code):
+                above &= ancestors[t]
+                if ancestors[t] & code == 1 << index[t]:
+                    children.append(t)
+            parents = [t for t in self._types(above)
+                       if descendants[t] & above == 1 << index[t]]
+            # other new types may fall in between; existing parents
+            # and children are each incomparable, so they are only
+            # compared with the new types and vice versa
+            new_parents = _minimal([other for other, other_code in new
+                                    if other_code != code
+                                    and other_code & code == code],
+                                   codeof, sizes)
+            new_children = _maximal([other for other, other_code in new
+                                     if other_code != code
+                                     and other_code & code == other_code],
+                                    codeof, sizes)
+            below = 0
+            for p in parents:
+                below |= 1 << index[p]
+            new_parents = [q for q in new_parents if not codeof[q] & below]
+            parents = [p for p in parents
+                       if not any(codeof[q] & descendants[p] == codeof[q]
+                                  for q in new_parents)]
+            new_children = [c for c in new_children
+                            if not any(codeof[c] & descendants[e] == codeof[c]
+                                       for e in children)]
+            covered = 0
+            for c in new_children:
+                covered |= codeof[c]
+            children = [c for c in children
+                        if not (covered >> index[c]) & 1]
+            links.append((name,
+                          parents + new_parents,
+                          children + new_children))
+        for name, _, _ in links:
+            hier[name] = ([], [])
+        for name, parents, children in links:
+            code = codeof[name]
+            for parent in parents:
+                hier[name][0].append(parent)
+                if parent in descendants:
+                    supertypes, subtypes = hier[parent]
+                    subtypes = [c for c in subtypes
+                                if codeof[c] & code != codeof[c]]
+                    subtypes.append(name)
+                    hier[parent] = (supertypes, subtypes)
+            for child in children:
+                hier[name][1].append(child)
+                if child in descendants:
+                    supertypes, subtypes = hier[child]
+                    supertypes = [p for p in supertypes
+                                  if codeof[p] & code != code]
+                    supertypes.append(name)
+                    hier[child] = (supertypes, subtypes)
+        self._order = _topological_order(self._top, hier)
+        self._bits = None
+
+
+def _minimal(types, codes, sizes):
+    """Return the *types* not above any others in *types*."""
+    # a type can only be above smaller ones, and if it is above any
+    # type it is above a minimal one
+    minimal = []
+    for t in sorted(types, key=sizes.__getitem__):
+        code = codes[t]
+        if not any(code & codes[u] == codes[u] for u in minimal):
+            minimal.append(t)
+    return minimal
+
+
+def _maximal(types, codes, sizes):
+    """Return the *types* not below any others in *types*."""
+    maximal = []
+    for t in sorted(types, key=sizes.__getitem__, reverse=True):
+        code = codes[t]
+        if not any(code & codes[u] == code for u in maximal):
+            maximal.append(t)
+    return maximal
+
+
+def _topological_order(top, hier):
+    """Order the types in *hier* so parents precede their children."""
+    remaining = dict((t, len(parents)) for t, (parents, _) in hier.items())
+    order = []
+    agenda = [top]
+    while agenda:
+        typename = agenda.pop()
+        order.append(typename)
+        for child in hier[typename][1]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                agenda.append(child)
+    return order
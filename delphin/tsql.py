@@ -75,6 +75,24 @@ This facilitates query construction, where a user may want to apply
 additional global constraints by appending new conditions to the query
 string.
 
+Besides selecting data, TSQL queries may modify a testsuite's tables
+on disk with `update` and `delete` queries::
+
+    update <table> set (<field> = <value>)+ [where <condition>]*
+    delete from <table> [where <condition>]*
+
+For example, the following removes the results of the item with
+identifier 10 and then marks that item as ungrammatical::
+
+    delete from result where i-id = 10
+    update item set i-wf = 0 where i-id = 10
+
+The conditions are the same as for `select` queries. Unqualified
+fields in conditions are first looked up in the modified table, and
+fields from other tables are joined as needed. Only the modified table
+is rewritten, and it is streamed from its file to a temporary file
+that then replaces it (see :meth:`delphin.itsdb.TestSuite.rewrite`).
+
 PyDelphin has several differences to standard TSQL:
 
 * `select *` requires a `from` clause
@@ -87,13 +105,30 @@ PyDelphin also adds some features to standard TSQL:
 
 * optional table specifications on columns (e.g., `item:i-id`)
 * multiple `where` clauses (as described above)
+
+Select queries use the secondary indexes of a testsuite (see
+:meth:`delphin.itsdb.TestSuite.create_index`) when the `where` clause
+compares an indexed column with `=`, `<`, `<=`, `>`, or `>=` and that
+comparison must hold for every result (that is, it is not inside a
+disjunction or negation). Only the rows of the indexed table found by
+the index are then scanned and joined, and the results are the same as
+without the index. For example, after indexing the `readings` column
+of the `parse` table, the following only joins the parses with
+readings::
+
+    select i-id i-input where readings > 0
+
+The `insert` query of standard TSQL is not supported.
 """
 
 import operator
 import copy
 import re
+import multiprocessing
+from collections import namedtuple
+from timeit import default_timer as _timer
 
-from delphin.exceptions import TSQLSyntaxError
+from delphin.exceptions import TSQLError, TSQLSyntaxError
 from delphin.util import LookaheadIterator, parse_datetime
 from delphin import itsdb
 
@@ -113,6 +148,12 @@ def inspect_query(query):
          'projection': ['i-input'],
          'tables': ['item'],
          'where': ('<', ('i-id', 100))}
+        >>> pprint(tsql.inspect_query(
+        ...     'update item set i-wf = 0 where i-id = 10'))
+        {'querytype': 'update',
+         'table': 'item',
+         'assignments': [('i-wf', 0)],
+         'where': ('==', ('i-id', 10))}
     """
     return _parse_query(query)
 
@@ -122,11 +163,18 @@ def query(query, ts, **kwargs):
     """
     Perform *query* on the testsuite *ts*.
 
-    Note: currently only 'select' queries are supported.
+    For 'select' queries, the results are returned as with
+    :func:`select`. For 'update' and 'delete' queries, the affected
+    table is rewritten on disk and the number of updated or deleted
+    rows is returned.
+
+    Note: 'insert' queries are not supported.
 
     Args:
         query (str): TSQL query string
-        ts (:class:`delphin.itsdb.TestSuite`): testsuite to query over
+        ts (:class:`delphin.itsdb.TestSuite`,
+            :class:`delphin.itsdb.ProfileCollection`): testsuite or
+            collection of testsuites to query over
         kwargs: keyword arguments passed to the more specific query
             function (e.g., :func:`select`)
     Example:
@@ -136,13 +184,22 @@ def query(query, ts, **kwargs):
     queryobj = _parse_query(query)
 
     if queryobj['querytype'] in ('select', 'retrieve'):
-        return _select(
+        return _select_source(
             queryobj['projection'],
             queryobj['tables'],
             queryobj['where'],
             ts,
             mode=kwargs.get('mode', 'list'),
-            cast=kwargs.get('cast', True))
+            cast=kwargs.get('cast', True),
+            jobs=kwargs.get('jobs'))
+    elif queryobj['querytype'] == 'update':
+        return _update(
+            queryobj['table'],
+            queryobj['assignments'],
+            queryobj['where'],
+            ts)
+    elif queryobj['querytype'] == 'delete':
+        return _delete(queryobj['table'], queryobj['where'], ts)
     else:
         # not really a syntax error; replace with TSQLError or something
         # when the proper exception class exists
@@ -150,38 +207,169 @@ def query(query, ts, **kwargs):
                               ' queries are not supported')
 
 
-def select(query, ts, mode='list', cast=True):
+def select(query, ts, mode='list', cast=True, jobs=None):
     """
     Perform the TSQL selection query *query* on testsuite *ts*.
 
     Note: The `select`/`retrieve` part of the query is not included.
 
+    If *ts* is a :class:`~delphin.itsdb.ProfileCollection`, the query
+    is performed on each of its testsuites in a pool of *jobs*
+    processes and the results are yielded in the order of the
+    collection's paths as each testsuite is finished. Each result is
+    prefixed by a `profile` pseudo-column containing the path of the
+    testsuite it came from (in `dict` mode it is the `"profile"` key).
+
     Args:
         query (str): TSQL select query
-        ts (:class:`delphin.itsdb.TestSuite`): testsuite to query over
+        ts (:class:`delphin.itsdb.TestSuite`,
+            :class:`delphin.itsdb.ProfileCollection`): testsuite or
+            collection of testsuites to query over
         mode (str): how to return the results (see
             :func:`delphin.itsdb.select_rows` for more information
             about the *mode* parameter; default: `list`)
         cast (bool): if `True`, values will be cast to their datatype
             according to the testsuite's relations (default: `True`)
+        jobs (int): number of processes used for querying a
+            collection; if `None`, use the number of CPUs; ignored if
+            *ts* is a single testsuite (default: `None`)
     Example:
         >>> list(tsql.select('i-id where i-length < 4', ts))
         [[142], [1061]]
     """
     queryobj = _parse_select(query)
-    return _select(
+    return _select_source(
         queryobj['projection'],
         queryobj['tables'],
         queryobj['where'],
         ts,
         mode,
-        cast)
+        cast,
+        jobs)
+
+
+def _select_source(projection, tables, condition, ts, mode, cast, jobs):
+    if isinstance(ts, itsdb.ProfileCollection):
+        return _select_collection(
+            projection, tables, condition, ts, mode, cast, jobs)
+    return _select(projection, tables, condition, ts, mode, cast)
+
+
+def _select_collection(projection, tables, condition, collection,
+                       mode, cast, jobs):
+    mode = mode.lower()
+    # rows are encoded in this process so the profile can be added
+    _mode = 'list' if mode == 'row' else mode
+    args = [(path, collection.relations, collection.encoding,
+             projection, tables, condition, _mode, cast)
+            for path in collection]
+    if jobs == 1 or len(args) <= 1:
+        results = (_select_testsuite(arg) for arg in args)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap(_select_testsuite, args)
+    try:
+        for path, rows in results:
+            for row in rows:
+                if mode == 'dict':
+                    row['profile'] = path
+                else:
+                    row.insert(0, path)
+                    if mode == 'row':
+                        row = itsdb.encode_row(row)
+                yield row
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
 
+def _select_testsuite(args):
+    # top-level function so it can be sent to worker processes
+    path, relations, encoding, projection, tables, condition, mode, cast = args
+    ts = itsdb.TestSuite(path, relations=relations, encoding=encoding)
+    rows = list(_select(projection, tables, condition, ts, mode, cast))
+    return path, rows
 
-def _select(projection, tables, condition, ts, mode, cast):
-    table = _select_from(tables, None, ts)
-    table = _select_projection(projection, table, ts)
-    table = _select_where(condition, table, ts)
+
+def explain(query, ts, cast=True):
+    """
+    Perform the TSQL query *query* on *ts* and report how it ran.
+
+    The query is fully evaluated, including the final selection (and
+    casting) of column values, but the selected data is discarded.
+    Instead, a list describing each stage of the evaluation, in order,
+    is returned. Each stage is a dictionary with the following keys:
+
+    ==========  ======================================================
+    Key         Description
+    ==========  ======================================================
+    clause      query clause prompting the stage (`from`,
+                `projection`, `where`, or `select`)
+    operation   `scan`, `index`, `join`, `filter`, or `select`
+    table       name of the scanned, joined, or filtered table
+    rows_in     number of rows going into the stage
+    rows_out    number of rows coming out of the stage
+    time        wall-clock time of the stage, in seconds
+    ==========  ======================================================
+
+    Join stages, which follow the path given by
+    :meth:`delphin.itsdb.Relations.path`, additionally have the `on`
+    (the pivot column) and `how` (`inner` or `left`) keys. The
+    `rows_in` value of a join counts the rows of the left table only;
+    the right table's size is given by its preceding scan. Index
+    stages, which replace the scan of a table restricted by an index
+    (see :meth:`delphin.itsdb.TestSuite.create_index`), additionally
+    have the `on` key giving the indexed columns.
+
+    Note: currently only 'select' queries are supported.
+
+    Args:
+        query (str): TSQL query string
+        ts (:class:`delphin.itsdb.TestSuite`): testsuite to query over
+        cast (bool): if `True`, values will be cast to their datatype
+            according to the testsuite's relations (default: `True`)
+    Returns:
+        list: a dictionary for each stage of the query's evaluation
+    Example:
+        >>> for stage in tsql.explain('select i-id where readings > 0', ts):
+        ...     print(stage['clause'], stage['operation'], stage['table'],
+        ...           stage['rows_in'], stage['rows_out'])
+        ...
+        projection scan item 3 3
+        where scan parse 3 3
+        where join parse 3 3
+        where filter item 3 2
+        select select item 2 2
+    """
+    queryobj = _parse_query(query)
+    if queryobj['querytype'] not in ('select', 'retrieve'):
+        raise TSQLSyntaxError(queryobj['querytype'] +
+                              ' queries are not supported')
+    plan = _Plan()
+    _select(
+        queryobj['projection'],
+        queryobj['tables'],
+        queryobj['where'],
+        ts,
+        'list',
+        cast,
+        plan=plan)
+    return list(plan)
+
+
+def _select(projection, tables, condition, ts, mode, cast, plan=None):
+    indexes = _index_scans(condition, ts)
+    if plan is not None:
+        plan.clause = 'from'
+    table = _select_from(tables, None, ts, plan, indexes)
+    if plan is not None:
+        plan.clause = 'projection'
+    table = _select_projection(projection, table, ts, plan, indexes)
+    if plan is not None:
+        plan.clause = 'where'
+    table = _select_where(condition, table, ts, plan, indexes)
 
     # finally select the relevant columns from the joined table
     if projection == '*':
@@ -192,26 +380,32 @@ def _select(projection, tables, condition, ts, mode, cast):
             for t in tables:
                 projection.extend(t + ':' + f.name
                                   for f in ts.relations[t])
-    return itsdb.select_rows(projection, table, mode=mode, cast=cast)
+    rows = itsdb.select_rows(projection, table, mode=mode, cast=cast)
+    if plan is not None:
+        plan.clause = 'select'
+        start = _timer()
+        rows = list(rows)
+        plan.step('select', table.name, len(table), len(rows), start)
+    return rows
 
 
-def _select_from(tables, table, ts):
+def _select_from(tables, table, ts, plan=None, indexes=None):
     joined = set([] if table is None else table.name.split('+'))
     for tab in tables:
         if tab not in joined:
             joined.add(tab)
-            table = _transitive_join(table, ts[tab], ts, 'inner')
+            table = _transitive_join(table, tab, ts, 'inner', plan, indexes)
     return table
 
 
-def _select_projection(projection, table, ts):
+def _select_projection(projection, table, ts, plan=None, indexes=None):
     if projection != '*':
         for p in projection:
-            table = _join_if_missing(table, p, ts, 'inner')
+            table = _join_if_missing(table, p, ts, 'inner', plan, indexes)
     return table
 
 
-def _select_where(condition, table, ts):
+def _select_where(condition, table, ts, plan=None, indexes=None):
     keys = table.fields.keys()
     ids = set()
     if condition is not None:
@@ -219,7 +413,10 @@ def _select_where(condition, table, ts):
         # join tables in the condition for filtering
         tmptable = table
         for field in fields:
-            tmptable = _join_if_missing(tmptable, field, ts, 'left')
+            tmptable = _join_if_missing(tmptable, field, ts, 'left', plan,
+                                        indexes)
+        start = _timer()
+        rows_in = len(table)
         # filter the rows and store the keys only
         for record in filter(func, tmptable):
             idtuple = tuple(record[key] for key in keys)
@@ -228,6 +425,8 @@ def _select_where(condition, table, ts):
         def meta_condition(rec):
             return tuple(rec[key] for key in keys) in ids
         table[:] = filter(meta_condition, table)
+        if plan is not None:
+            plan.step('filter', table.name, rows_in, len(table), start)
     return table
 
 
@@ -270,7 +469,7 @@ def _process_condition(condition):
     return func, fields
 
 
-def _join_if_missing(table, col, ts, how):
+def _join_if_missing(table, col, ts, how, plan=None, indexes=None):
     tab, _, column = col.rpartition(':')
     if not tab:
         # Just get the first table defining the column. This
@@ -278,23 +477,229 @@ def _join_if_missing(table, col, ts, how):
         # that the first one is 'primary'
         tab = ts.relations.find(column)[0]
     if table is None or column not in table.fields:
-        table = _transitive_join(table, ts[tab], ts, how)
+        table = _transitive_join(table, tab, ts, how, plan, indexes)
     return table
 
 
-def _transitive_join(tab1, tab2, ts, how):
+def _transitive_join(tab1, tab2, ts, how, plan=None, indexes=None):
     if tab1 is None:
-        table = copy.copy(tab2)
+        table = copy.copy(_scan(tab2, ts, how, plan, indexes))
     else:
         table = tab1
         # the tables may not be directly joinable but could be
         # joinable transitively via a 'path' of table joins
-        path = ts.relations.path(tab1.name, tab2.name)
+        path = ts.relations.path(tab1.name, tab2)
         for intervening, pivot in path:
-            table = itsdb.join(table, ts[intervening], on=pivot, how=how)
+            right = _scan(intervening, ts, how, plan, indexes)
+            start = _timer()
+            rows_in = len(table)
+            table = itsdb.join(table, right, on=pivot, how=how)
+            if plan is not None:
+                plan.step('join', intervening, rows_in, len(table), start,
+                          on=pivot, how=how)
     return table
 
 
+def _scan(tablename, ts, how, plan, indexes=None):
+    start = _timer()
+    table = ts[tablename]  # tables may be (re)loaded on access
+    rows_in = len(table)
+    scan = indexes.get(tablename) if indexes else None
+    # the index describes the table on disk, so don't use it if the
+    # table in memory has been changed since it was loaded or written
+    if (scan is not None and not table.modified
+            and scan.rowcount == rows_in
+            and (scan.left if how == 'left' else scan.inner)):
+        restricted = copy.copy(table)
+        restricted[:] = [table[i] for i in scan.rows]
+        table = restricted
+        if plan is not None:
+            plan.step('index', tablename, rows_in, len(table), start,
+                      on=scan.columns)
+    elif plan is not None:
+        plan.step('scan', tablename, rows_in, rows_in, start)
+    return table
+
+
+_IndexScan = namedtuple('_IndexScan', 'columns rowcount rows left inner')
+
+
+def _index_scans(condition, ts):
+    """
+    Find the rows of indexed tables that may meet *condition*.
+
+    Only comparisons of indexed columns that must hold for the whole
+    condition (i.e., the top-level conjuncts) are used. The rows of a
+    table not found by its indexes could only contribute results that
+    fail the condition, so the table may be restricted to the found
+    rows when it is scanned. This is always safe for left joins in
+    the `where` clause when the column's default value (used when a
+    row has no match) fails the comparison, and it is safe for inner
+    joins when the key fields of the table identify its rows (as
+    filtered rows are matched by their keys).
+    """
+    scans = {}
+    for op, body in _conjuncts(condition):
+        if op not in ('==', '<', '<=', '>', '>='):
+            continue
+        field, value = body
+        tablename, _, column = field.rpartition(':')
+        if not tablename:
+            # as in _join_if_missing(), the first table defining the
+            # column is used; this is only certain to be the table
+            # providing the column's values if no other table defines
+            # it or if it is a key shared by the joined tables
+            tablenames = ts.relations.find(column)
+            tablename = tablenames[0]
+            if (len(tablenames) > 1
+                    and column not in ts.relations[tablename].keys()):
+                continue
+        index = ts.get_index(tablename, column)
+        if index is None:
+            continue
+        try:
+            rows = index.lookup(op, value)
+        except TypeError:  # value and column datatypes don't compare
+            continue
+        relation = ts.relations[tablename]
+        field = relation[relation.index(column)]
+        default = itsdb.Record(itsdb.Relation(tablename, [field]),
+                               [field.default_value()])
+        try:
+            compare = _operator_functions[op]
+            left = not compare(default.get(column, cast=True), value)
+        except (TypeError, ValueError):
+            left = False
+        if tablename in scans:
+            prev = scans[tablename]
+            rows = sorted(set(prev.rows).intersection(rows))
+            scans[tablename] = _IndexScan(prev.columns + (column,),
+                                          index.rowcount,
+                                          rows,
+                                          left or prev.left,
+                                          index.unique_keys)
+        else:
+            scans[tablename] = _IndexScan((column,),
+                                          index.rowcount,
+                                          rows,
+                                          left,
+                                          index.unique_keys)
+    return scans
+
+
+def _conjuncts(condition):
+    if condition is None:
+        return []
+    op, body = condition
+    if op == 'and':
+        return [conj for cond in body for conj in _conjuncts(cond)]
+    return [condition]
+
+
+class _Plan(list):
+    """
+    Accumulate the stages of a query's execution for :func:`explain`.
+    """
+    def __init__(self):
+        super(_Plan, self).__init__()
+        self.clause = None
+
+    def step(self, operation, table, rows_in, rows_out, start, **kwargs):
+        stage = {'clause': self.clause,
+                 'operation': operation,
+                 'table': table,
+                 'rows_in': rows_in,
+                 'rows_out': rows_out,
+                 'time': _timer() - start}
+        stage.update(kwargs)
+        self.append(stage)
+
+
+def _update(tablename, assignments, condition, ts):
+    relation = ts.relations[tablename]
+    columns = []
+    for col, value in assignments:
+        tab, _, col = col.rpartition(':')
+        if (tab and tab != tablename) or col not in relation:
+            raise TSQLError('cannot update {} in the {} table'
+                            .format(col, tablename))
+        columns.append((relation.index(col), value))
+    matches = _row_matcher(tablename, condition, ts)
+    count = [0]
+
+    def update(record):
+        if matches(record):
+            for i, value in columns:
+                record[i] = value
+            count[0] += 1
+        return record
+
+    ts.rewrite(tablename, update)
+    return count[0]
+
+
+def _delete(tablename, condition, ts):
+    matches = _row_matcher(tablename, condition, ts)
+    count = [0]
+
+    def delete(record):
+        if matches(record):
+            count[0] += 1
+            return None
+        return record
+
+    ts.rewrite(tablename, delete)
+    return count[0]
+
+
+def _row_matcher(tablename, condition, ts):
+    """
+    Return a function that tests if a record of *tablename* meets
+    *condition*.
+    """
+    if condition is None:
+        return lambda record: True
+    relation = ts.relations[tablename]
+    func, fields = _process_condition(condition)
+    local = [_local_column(field, tablename, relation) for field in fields]
+    # when all fields are in the table, each record is tested directly
+    if all(col is not None for col in local):
+        func, _ = _process_condition(
+            _localize_condition(condition, tablename, relation))
+        return func
+    # otherwise join the other tables and find matching records by
+    # their values, which are unaffected by the joins
+    table = ts[tablename]
+    for field, col in zip(fields, local):
+        if col is None:
+            table = _join_if_missing(table, field, ts, 'left')
+    names = [tablename + ':' + f.name for f in relation]
+    matched = set(tuple(record[name] for name in names)
+                  for record in filter(func, table))
+    return lambda record: tuple(record) in matched
+
+
+def _local_column(field, tablename, relation):
+    tab, _, col = field.rpartition(':')
+    if (not tab or tab == tablename) and col in relation:
+        return col
+    return None
+
+
+def _localize_condition(condition, tablename, relation):
+    # remove table names from columns so they can be used directly
+    # on records of the table
+    op, body = condition
+    if op in ('and', 'or'):
+        return (op, tuple(_localize_condition(cond, tablename, relation)
+                          for cond in body))
+    elif op == 'not':
+        return (op, _localize_condition(body, tablename, relation))
+    else:
+        field, value = body
+        return (op, (_local_column(field, tablename, relation), value))
+
+
 ### QUERY PARSING #############################################################
 
 _keywords = list(map(re.escape,
@@ -362,6 +767,10 @@ def _parse_query(query):
     querytype = querytype.lower()
     if querytype in ('select', 'retrieve'):
         result = _parse_select(querybody)
+    elif querytype == 'update':
+        result = _parse_update(querybody)
+    elif querytype == 'delete':
+        result = _parse_delete(querybody)
     else:
         raise TSQLSyntaxError("'{}' queries are not supported"
                               .format(querytype), lineno=1)
@@ -393,6 +802,62 @@ def _parse_select(query):
             'where': condition}
 
 
+def _parse_update(query):
+    tokens = LookaheadIterator(_lex(query))
+
+    gid, table, lineno = tokens.next()
+    _expect(gid == 10, table, lineno, 'a table name')
+    gid, token, lineno = tokens.next()
+    _expect(gid == 1 and token.lower() == 'set', token, lineno, "'set'")
+    assignments = [_parse_assignment(tokens)]
+    while tokens.peek()[0] == 10:
+        assignments.append(_parse_assignment(tokens))
+    condition = _parse_select_where(tokens)
+
+    gid, token, lineno = tokens.next()
+    _expect(gid == 1 and token == '.', token, lineno, "'.'")
+
+    return {'querytype': 'update',
+            'table': table,
+            'assignments': assignments,
+            'where': condition}
+
+
+def _parse_assignment(tokens):
+    gid, column, lineno = tokens.next()
+    _expect(gid == 10, column, lineno, 'a column name')
+    gid, op, lineno = tokens.next()
+    _expect(gid == 2 and op in ('=', '=='), op, lineno, "'='")
+    gid, value, lineno = tokens.next()
+    if gid in (4, 5):
+        value = re.sub(r'\\(["\'\\])', r'\1', value)
+    elif gid in (6, 7, 8):
+        value = parse_datetime(value)
+    elif gid == 9:
+        value = int(value)
+    else:
+        raise TSQLSyntaxError('expected an integer, date, or string',
+                              lineno=lineno, text=value)
+    return (column, value)
+
+
+def _parse_delete(query):
+    tokens = LookaheadIterator(_lex(query))
+
+    gid, token, lineno = tokens.next()
+    _expect(gid == 1 and token.lower() == 'from', token, lineno, "'from'")
+    gid, table, lineno = tokens.next()
+    _expect(gid == 10, table, lineno, 'a table name')
+    condition = _parse_select_where(tokens)
+
+    gid, token, lineno = tokens.next()
+    _expect(gid == 1 and token == '.', token, lineno, "'.'")
+
+    return {'querytype': 'delete',
+            'table': table,
+            'where': condition}
+
+
 def _parse_select_projection(tokens):
     gid, token, lineno = tokens.next()
     if token == '*':
@@ -0,0 +1,392 @@
+
+"""
+Unification of feature structures.
+
+This module unifies the feature structures of
+:class:`~delphin.tfs.FeatureStructure` and
+:class:`~delphin.tfs.TypedFeatureStructure` objects and of TDL
+definitions and terms (:class:`~delphin.tdl.TypeDefinition`,
+:class:`~delphin.tdl.Conjunction`, and :class:`~delphin.tdl.AVM`
+objects, including lists). Inputs are first compiled into feature
+graphs (:class:`Graph` objects), where TDL coreferences and values
+shared by feature structures become shared nodes, and the graphs are
+unified with the quasi-destructive algorithm of Tomabechi, 1991
+[TOM1991]_. Nodes are merged by forwarding one to the other, as in a
+union-find structure, and every change is stamped with the number of
+the current unification, so the changes are discarded simply by
+starting the next one. Compiled graphs are therefore never visibly
+modified and may be unified any number of times, and a failed
+unification does no work beyond what was done before the failure.
+The result of a successful unification is copied into a new graph.
+
+Types are unified through the greatest lower bound (see
+:meth:`delphin.tfs.TypeHierarchy.glb`) if a type hierarchy is given,
+otherwise only identical types unify. TDL strings unify with equal
+strings and with the supertypes of the :data:`STRING_TYPE` type if it
+is in the hierarchy. TDL type identifiers are downcased, as by
+:meth:`delphin.tfs.TypeHierarchy.from_tdl`.
+
+.. [TOM1991] Hideto Tomabechi. Quasi-destructive graph unification.
+  In Proceedings of the 29th Annual Meeting of the Association for
+  Computational Linguistics, pages 315--322, 1991.
+
+Example:
+
+>>> from delphin import tfs, unification
+>>> th = tfs.TypeHierarchy('*top*', {'a': ['*top*'],
+...                                  'b': ['*top*'],
+...                                  'c': ['a', 'b']})
+>>> fs = unification.unify(
+...     tfs.TypedFeatureStructure('a', [('F', 'a')]),
+...     tfs.TypedFeatureStructure('b', [('F', 'b'), ('G', 'a')]),
+...     hierarchy=th)
+>>> fs.type, fs['F'], fs['G']
+('c', 'c', 'a')
+"""
+
+from __future__ import unicode_literals
+
+from itertools import count
+
+from delphin.exceptions import UnificationError
+from delphin.tfs import FeatureStructure, TypedFeatureStructure
+from delphin import tdl
+
+STRING_TYPE = 'string'  #: supertype of all TDL strings
+
+# every compilation and unification has its own generation number;
+# changes to nodes stamped with an earlier number are ignored
+_generations = count(1)
+_FAIL = object()  # type unification failure (None is an untyped node)
+
+
+class _Node(object):
+    """
+    A node in a feature graph.
+
+    The `type` and `arcs` attributes never change once the node is in
+    a compiled graph. During a unification, the node may be forwarded
+    to another node and its type and additional arcs are kept in the
+    `comp_` attributes; these are only valid when the corresponding
+    generation number is the current one.
+    """
+
+    __slots__ = ('type', 'arcs', 'forward', 'forward_gen',
+                 'comp_type', 'comp_arcs', 'comp_gen',
+                 'copy', 'copy_gen')
+
+    def __init__(self, type=None, arcs=None):
+        self.type = type
+        self.arcs = {} if arcs is None else arcs
+        self.forward = None
+        self.forward_gen = 0
+        self.comp_type = None
+        self.comp_arcs = None
+        self.comp_gen = 0
+        self.copy = None
+        self.copy_gen = 0
+
+
+class Graph(object):
+    """
+    A compiled feature graph.
+
+    Graphs are created by :meth:`Unifier.compile` and
+    :meth:`Unifier.unify` and may be passed to either method in place
+    of the objects they were compiled from.
+    """
+
+    __slots__ = ('_root',)
+
+    def __init__(self, root):
+        self._root = root
+
+    def __repr__(self):
+        return '<Graph object ({}) at {}>'.format(self._root.type, id(self))
+
+    @property
+    def type(self):
+        """The type of the root node."""
+        return self._root.type
+
+    def to_fs(self):
+        """
+        Return the graph as a :class:`~delphin.tfs.TypedFeatureStructure`.
+
+        Nodes without features are given as their types, unless they
+        are shared, in which case they are also typed feature
+        structures. Shared nodes are the same object at each feature
+        path where they occur.
+        """
+        return _to_fs(self._root)
+
+
+class Unifier(object):
+    """
+    A unifier of feature structures under a type hierarchy.
+
+    Args:
+        hierarchy (:class:`~delphin.tfs.TypeHierarchy`): the hierarchy
+            for unifying types (default: `None`, so only identical
+            types unify)
+    Example:
+        >>> unifier = Unifier(hierarchy)
+        >>> rule = unifier.compile(rules['head-comp'])
+        >>> results = [unifier.unify(rule, entry, path='ARGS.FIRST')
+        ...            for entry in lexicon]
+    """
+
+    def __init__(self, hierarchy=None):
+        self.hierarchy = hierarchy
+
+    def compile(self, obj):
+        """
+        Compile *obj* into a feature graph.
+
+        Args:
+            obj: a :class:`~delphin.tfs.FeatureStructure` or TDL
+                definition, conjunction, or term
+        Returns:
+            a :class:`Graph`
+        Raises:
+            :class:`~delphin.exceptions.UnificationError`: when the
+                conjunctions or coreferences in *obj* do not unify or
+                when a type they unify is not in the hierarchy
+        """
+        if isinstance(obj, Graph):
+            return obj
+        gen = next(_generations)
+        equations = []
+        root = _build(obj, {}, {}, equations)
+        for node1, node2 in equations:
+            if not self._unify(node1, node2, gen):
+                raise UnificationError(
+                    'inconsistent feature structure: {!r}'.format(obj))
+        return Graph(_copy(root, gen))
+
+    def unify(self, a, b, path=None):
+        """
+        Unify *a* and *b* and return the result.
+
+        Args:
+            a: a :class:`Graph` or an object that can be compiled
+            b: a :class:`Graph` or an object that can be compiled
+            path (str): if given, *b* is unified with the value of
+                this feature path in *a* (e.g., `"ARGS.FIRST"`)
+        Returns:
+            a new :class:`Graph` for the result, or `None` if *a* and
+            *b* do not unify
+        Raises:
+            :class:`~delphin.exceptions.UnificationError`: when a type
+                is unified with a different type and is not in the
+                hierarchy
+            ValueError: when two types do not have a unique glb
+        """
+        root1 = self.compile(a)._root
+        root2 = self.compile(b)._root
+        if path:
+            for feature in reversed(path.upper().split('.')):
+                root2 = _Node(None, {feature: root2})
+        gen = next(_generations)
+        if not self._unify(root1, root2, gen):
+            return None
+        return Graph(_copy(root1, gen))
+
+    def _unify(self, node1, node2, gen):
+        node1 = _deref(node1, gen)
+        node2 = _deref(node2, gen)
+        if node1 is node2:
+            return True
+        type1 = node1.comp_type if node1.comp_gen == gen else node1.type
+        type2 = node2.comp_type if node2.comp_gen == gen else node2.type
+        type_ = self._unify_types(type1, type2)
+        if type_ is _FAIL:
+            return False
+        if node1.comp_gen != gen:
+            node1.comp_gen = gen
+            node1.comp_arcs = {}
+        node1.comp_type = type_
+        # forward before descending so cyclic graphs terminate
+        node2.forward = node1
+        node2.forward_gen = gen
+        arcs1 = node1.arcs
+        comp_arcs1 = node1.comp_arcs
+        for feature, sub2 in _arcs(node2, gen):
+            sub1 = arcs1.get(feature)
+            if sub1 is None:
+                sub1 = comp_arcs1.get(feature)
+            if sub1 is None:
+                comp_arcs1[feature] = sub2
+            elif not self._unify(sub1, sub2, gen):
+                return False
+        return True
+
+    def _unify_types(self, type1, type2):
+        if type1 is None:
+            return type2
+        is_string1 = isinstance(type1, tdl.String)
+        is_string2 = isinstance(type2, tdl.String)
+        if type2 is None or (type1 == type2 and is_string1 == is_string2):
+            return type1
+        hierarchy = self.hierarchy
+        if hierarchy is None or (is_string1 and is_string2):
+            return _FAIL
+        elif is_string1 or is_string2:
+            string, other = (type1, type2) if is_string1 else (type2, type1)
+            if STRING_TYPE not in hierarchy:
+                return _FAIL
+            if other not in hierarchy:
+                raise _unknown_type(other)
+            return string if hierarchy.subsumes(other, STRING_TYPE) else _FAIL
+        try:
+            glb = hierarchy.glb(type1, type2)
+        except KeyError:
+            raise _unknown_type(type2 if type1 in hierarchy else type1)
+        return _FAIL if glb is None else glb
+
+
+def _unknown_type(type_):
+    return UnificationError(
+        'type is not in the hierarchy: {}'.format(type_))
+
+
+def unify(a, b, hierarchy=None, path=None):
+    """
+    Unify feature structures *a* and *b*.
+
+    This is a convenience function for unifying with a new
+    :class:`Unifier`; use a :class:`Unifier` and compiled graphs to
+    unify the same structures repeatedly.
+
+    Args:
+        a: a :class:`~delphin.tfs.FeatureStructure`, TDL definition,
+            conjunction, or term, or a :class:`Graph`
+        b: a :class:`~delphin.tfs.FeatureStructure`, TDL definition,
+            conjunction, or term, or a :class:`Graph`
+        hierarchy (:class:`~delphin.tfs.TypeHierarchy`): the hierarchy
+            for unifying types
+        path (str): if given, *b* is unified with the value of this
+            feature path in *a*
+    Returns:
+        a :class:`~delphin.tfs.TypedFeatureStructure`, or `None` if
+        *a* and *b* do not unify
+    Raises:
+        :class:`~delphin.exceptions.UnificationError`: when *a* or *b*
+            is not consistent by itself, or when a type is unified with
+            a different type and is not in *hierarchy*
+        ValueError: when two types do not have a unique glb
+    """
+    result = Unifier(hierarchy).unify(a, b, path=path)
+    if result is not None:
+        result = result.to_fs()
+    return result
+
+
+def _deref(node, gen):
+    while node.forward_gen == gen:
+        node = node.forward
+    return node
+
+
+def _arcs(node, gen):
+    """Return the feature-node pairs of *node* in generation *gen*."""
+    arcs = list(node.arcs.items())
+    if node.comp_gen == gen:
+        arcs.extend(node.comp_arcs.items())
+    return arcs
+
+
+def _copy(node, gen):
+    node = _deref(node, gen)
+    if node.copy_gen == gen:
+        return node.copy
+    new = _Node(node.comp_type if node.comp_gen == gen else node.type)
+    node.copy = new
+    node.copy_gen = gen
+    arcs = new.arcs
+    for feature, sub in _arcs(node, gen):
+        arcs[feature] = _copy(sub, gen)
+    return new
+
+
+def _build(obj, tags, memo, equations):
+    """
+    Build nodes for *obj*, collecting the pairs of nodes that must be
+    unified (for conjunctions and coreferences) in *equations*.
+    """
+    if isinstance(obj, Graph):
+        return obj._root
+    elif isinstance(obj, tdl.TypeDefinition):
+        return _build(obj.conjunction, tags, memo, equations)
+    elif isinstance(obj, tdl.Conjunction):
+        node = _Node()
+        for term in obj.terms:
+            equations.append((node, _build(term, tags, memo, equations)))
+        return node
+    elif isinstance(obj, tdl.Coreference):
+        # unnamed coreferences (e.g., in diff-lists) are the same object
+        key = obj if obj.identifier is None else obj.identifier
+        if key not in tags:
+            tags[key] = _Node()
+        return tags[key]
+    elif isinstance(obj, tdl.TypeIdentifier):
+        return _Node(obj.lower())
+    elif isinstance(obj, tdl.AVM):
+        return _build_avm(obj, tags, memo, equations)
+    elif isinstance(obj, FeatureStructure):
+        if id(obj) in memo:
+            return memo[id(obj)]
+        node = memo[id(obj)] = _Node(getattr(obj, 'type', None))
+        for feature, value in (obj._avm or {}).items():
+            node.arcs[feature] = _build(value, tags, memo, equations)
+        return node
+    else:  # atomic values, including TDL strings and regexes
+        return _Node(obj)
+
+
+def _build_avm(avm, tags, memo, equations):
+    if avm._avm is None:  # closed empty list
+        return _Node(tdl.EMPTY_LIST_TYPE)
+    node = _Node()
+    for feature, value in avm._avm.items():
+        if value is None:  # end of a closed list
+            sub = _Node(tdl.EMPTY_LIST_TYPE)
+        else:
+            sub = _build(value, tags, memo, equations)
+        node.arcs[feature] = sub
+    if isinstance(avm, tdl.ConsList) and not avm.terminated:
+        end = node
+        if avm._last_path:
+            for feature in avm._last_path.split('.'):
+                end = end.arcs[feature]
+        if end.type is None:
+            end.type = tdl.LIST_TYPE
+    return node
+
+
+def _to_fs(root):
+    # count references to find shared nodes
+    refs = {}
+    seen = set([id(root)])
+    agenda = [root]
+    while agenda:
+        node = agenda.pop()
+        for sub in node.arcs.values():
+            refs[id(sub)] = refs.get(id(sub), 0) + 1
+            if id(sub) not in seen:
+                seen.add(id(sub))
+                agenda.append(sub)
+    memo = {}
+
+    def convert(node):
+        key = id(node)
+        if key in memo:
+            return memo[key]
+        if not node.arcs and refs.get(key, 0) < 2 and node is not root:
+            return node.type
+        fs = memo[key] = TypedFeatureStructure(node.type)
+        for feature, sub in node.arcs.items():
+            fs[feature] = convert(sub)
+        return fs
+
+    return convert(root)
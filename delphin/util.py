@@ -2,6 +2,7 @@
 from __future__ import absolute_import
 
 import warnings, codecs, io
+import os
 import re
 from datetime import datetime
 
@@ -37,6 +38,9 @@ try:
 except NameError:
     stringtypes = (str,)  # Python 3
 
+# os.replace() is atomic on all platforms but only exists from Python 3.3
+replace_file = getattr(os, 'replace', os.rename)
+
 def safe_int(x):
     try:
         x = int(x)
@@ -54,7 +54,6 @@ setup(
     ],
     install_requires=[
         'penman >=0.6.1',
-        'networkx',
         'requests',
         'Pygments',
     ],
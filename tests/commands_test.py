@@ -197,6 +197,12 @@ def test_select(mini_testsuite):
     select('result:mrs', itsdb.ItsdbProfile(ts0))
     select('parse:i-id@result:mrs', ts0)
     select('result:result-id@mrs', ts0, mode='row')
+    stages = select('i-id where readings > 0', ts0, explain=True)
+    assert stages[-1]['rows_out'] == 2
+    assert list(select('i-id where i-id = 20', [ts0, ts0], jobs=1)) == [
+        [ts0, 20], [ts0, 20]]
+    with pytest.raises(ValueError):
+        select('i-id', [ts0, ts0], explain=True)
 
 
 def test_compare(mini_testsuite):
@@ -206,6 +212,9 @@ def test_compare(mini_testsuite):
     with pytest.raises(TypeError):
         compare(gold=ts0)
     compare(ts0, ts0)
+    serial = list(compare(ts0, ts0, jobs=1))
+    assert [r['id'] for r in serial] == [10, 30]
+    assert list(compare(ts0, ts0, jobs=2)) == serial
 
 
 def test_repp(sentence_file):
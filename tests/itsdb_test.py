@@ -276,6 +276,14 @@ def test_Table(single_item_skeleton):
     assert t.name == 'item'
     assert len(t) == 1
 
+    # tables from files are unmodified until they or their records change
+    assert not t.modified
+    t[0]['i-input'] = 'The cat meows.'
+    assert t.modified
+    t = itsdb.Table.from_file(itemfile)
+    t.append(itsdb.Record(t.fields, (1, 'The cat meows.')))
+    assert t.modified
+
 class TestSuite(object):
     def test_init(self, single_item_profile):
         rels = itsdb.Relations.from_string(_simple_relations)
@@ -334,6 +342,65 @@ class TestSuite(object):
         ts = itsdb.TestSuite(str(d))
         assert 'i-date' in ts['item'].fields
 
+    def test_rewrite(self, single_item_profile, tmpdir):
+        t = itsdb.TestSuite(single_item_profile)
+        def edit(record):
+            record['i-input'] = 'The dog sleeps.'
+            return record
+        t.rewrite('item', edit)
+        assert t['item'][0]['i-input'] == 'The dog sleeps.'
+        t.rewrite('result', lambda record: None)
+        assert len(t['result']) == 0
+        assert len(t['parse']) == 1
+        def fail(record):
+            raise ValueError()
+        with pytest.raises(ValueError):
+            t.rewrite('item', fail)
+        assert sorted(os.listdir(single_item_profile)) == [
+            'item', 'parse', 'relations', 'result', 'run']
+        t = itsdb.TestSuite(relations=str(tmpdir.join('single', 'relations')))
+        with pytest.raises(itsdb.ItsdbError):
+            t.rewrite('item', edit)
+
+    def test_index(self, single_item_profile, tmpdir):
+        t = itsdb.TestSuite(single_item_profile)
+        assert t.get_index('item', 'i-id') is None
+        index = t.create_index('item', 'i-id')
+        assert os.path.isfile(os.path.join(single_item_profile,
+                                           'item.i-id.idx'))
+        assert (index.column, index.datatype) == ('i-id', ':integer')
+        assert index.rowcount == 1 and index.unique_keys
+        assert index.lookup('==', 0) == [0]
+        assert index.lookup('>', 0) == []
+        assert index.lookup('<=', 0) == [0]
+        with pytest.raises(itsdb.ItsdbError):
+            index.lookup('!=', 0)
+        with pytest.raises(itsdb.ItsdbError):
+            t.create_index('item', 'readings')
+        # indexes are loaded from disk
+        t = itsdb.TestSuite(single_item_profile)
+        assert t.get_index('item', 'i-id').lookup('>=', 0) == [0]
+        # and rebuilt when the table is written by the testsuite
+        t['item'].append(itsdb.Record(t.relations['item'],
+                                      {'i-id': -5, 'i-input': 'Dogs.'}))
+        t.write('item')
+        index = t.get_index('item', 'i-id')
+        assert index.rowcount == 2
+        assert index.lookup('<', 0) == [1]
+        t.rewrite('item', lambda record: None)
+        assert len(t.get_index('item', 'i-id')) == 0
+        # but not when modified otherwise
+        with open(os.path.join(single_item_profile, 'item'), 'w') as f:
+            f.write('0@The dog barks.\n1@The cat meows.\n')
+        assert t.get_index('item', 'i-id') is None
+        t.drop_index('item', 'i-id')
+        assert not os.path.exists(os.path.join(single_item_profile,
+                                               'item.i-id.idx'))
+        t = itsdb.TestSuite(relations=str(tmpdir.join('single', 'relations')))
+        assert t.get_index('item', 'i-id') is None
+        with pytest.raises(itsdb.ItsdbError):
+            t.create_index('item', 'i-id')
+
     def test_process(self, parser_cpu, single_item_skeleton):
         ts = itsdb.TestSuite(single_item_skeleton)
         assert len(ts['parse']) == 0
@@ -348,6 +415,21 @@ class TestSuite(object):
         assert ts['result'][1]['parse-id'] == 0
         assert ts['result'][1]['result-id'] == 1
 
+def test_ProfileCollection(single_item_skeleton, single_item_profile,
+                           tmpdir):
+    pc = itsdb.ProfileCollection(single_item_profile)
+    assert pc.paths == (single_item_profile,)
+    pc = itsdb.ProfileCollection(str(tmpdir.join('s*')))
+    assert pc.paths == (single_item_profile, single_item_skeleton)
+    assert len(pc) == 2
+    pc = itsdb.ProfileCollection([single_item_profile,
+                                  str(tmpdir.join('missing*'))])
+    assert list(pc) == [single_item_profile]
+    assert [len(ts['result']) for ts in pc.testsuites()] == [1]
+    with pytest.raises(itsdb.ItsdbError):
+        itsdb.ProfileCollection(single_item_profile,
+                                relations=str(tmpdir.join('missing')))
+
 def test_get_data_specifier():
     dataspec = itsdb.get_data_specifier
     assert dataspec('item') == ('item', None)
@@ -404,6 +486,18 @@ def test_select_rows(single_item_profile):
     # assert list(itsdb.select_rows(None, p.read_table('item'))) == [['0', 'The dog barks.']]
     assert list(itsdb.select_rows(['i-id', 'i-input'], p.read_table('item'))) == [['0', 'The dog barks.']]
     assert list(itsdb.select_rows(['item:i-id', 'parse:parse-id'], p.join('item', 'parse'))) == [['0', '0']]
+    t = itsdb.TestSuite(single_item_profile)
+    item = t['item']
+    assert list(itsdb.select_rows(['i-id', 'i-input'], item)) == [[0, 'The dog barks.']]
+    assert list(itsdb.select_rows(['i-id'], item, cast=False)) == [['0']]
+    assert list(itsdb.select_rows(['item:i-id', 'i-wf'], item)) == [[0, None]]
+    with pytest.raises(itsdb.ItsdbError):
+        list(itsdb.select_rows(['parse:i-id'], item))
+    assert list(itsdb.select_rows(['i-id', 'parse-id'], itsdb.join(item, t['parse']), mode='row')) == ['0@0']
+    rels = itsdb.Relations.from_string(_alt_relations)
+    d = datetime.datetime(2018, 2, 1, 15, 0)
+    item = itsdb.Table('item', rels['item'], [[10, 'a', '2018-02-01 15:00'], [20, 'b', d]])
+    assert list(itsdb.select_rows(['i-id', 'i-date'], item)) == [[10, d], [20, d]]
 
 def test_match_rows():
     assert list(itsdb.match_rows(
@@ -158,3 +158,63 @@ def test_isomorphic():
     assert compare.isomorphic(x1, x2) == True # if normalized
     assert compare.isomorphic(x1, x1) == True # identity
     assert compare.isomorphic(x2, x2) == True # identity
+    # variable names and the order of EPs and HCONS don't matter
+    y1 = simplemrs.loads_one('''
+    [ LTOP: h0 INDEX: e2
+      RELS: < [ _the_q LBL: h4 ARG0: x3 RSTR: h5 BODY: h6 ]
+              [ _dog_n_1 LBL: h7 ARG0: x3 ]
+              [ _chase_v_1 LBL: h1 ARG0: e2 ARG1: x3 ARG2: x8 ]
+              [ _cat_n_1 LBL: h9 ARG0: x8 ]
+              [ _a_q LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ] >
+      HCONS: < h0 qeq h1 h5 qeq h7 h11 qeq h9 > ]''')
+    y2 = simplemrs.loads_one('''
+    [ LTOP: h20 INDEX: e22
+      RELS: < [ _cat_n_1 LBL: h29 ARG0: x28 ]
+              [ _a_q LBL: h30 ARG0: x28 RSTR: h31 BODY: h32 ]
+              [ _chase_v_1 LBL: h21 ARG0: e22 ARG1: x23 ARG2: x28 ]
+              [ _the_q LBL: h24 ARG0: x23 RSTR: h25 BODY: h26 ]
+              [ _dog_n_1 LBL: h27 ARG0: x23 ] >
+      HCONS: < h31 qeq h29 h25 qeq h27 h20 qeq h21 > ]''')
+    # the dog and cat have swapped roles
+    y3 = simplemrs.loads_one('''
+    [ LTOP: h0 INDEX: e2
+      RELS: < [ _the_q LBL: h4 ARG0: x3 RSTR: h5 BODY: h6 ]
+              [ _dog_n_1 LBL: h7 ARG0: x3 ]
+              [ _chase_v_1 LBL: h1 ARG0: e2 ARG1: x8 ARG2: x3 ]
+              [ _cat_n_1 LBL: h9 ARG0: x8 ]
+              [ _a_q LBL: h10 ARG0: x8 RSTR: h11 BODY: h12 ] >
+      HCONS: < h0 qeq h1 h5 qeq h7 h11 qeq h9 > ]''')
+    assert compare.isomorphic(y1, y2) == True
+    assert compare.isomorphic(y1, y3) == False
+    assert compare.isomorphic(m0, m0) == True  # empty
+    assert compare.isomorphic(m0, m1) == False
+
+def test_canonical_hash():
+    h = compare.canonical_hash
+    assert h(m1) == h(m1)
+    assert h(m1) == h(m1b)  # diff Lnk only
+    assert h(m1) != h(m1c)  # diff TENSE value
+    assert h(m1, check_varprops=False) == h(m1c, check_varprops=False)
+    assert h(m1) != h(m1d)
+    assert h(m1) != h(m1e)
+    assert h(m1) != h(m1f)
+    assert h(m1) != h(m1g)
+    assert h(pathological1) != h(pathological2)
+    assert h(x1) == h(x2)
+    assert h(m0) == h(m0)
+    # the hash does not depend on variable names
+    m = simplemrs.loads_one(simplemrs.dumps_one(m1).replace('h1', 'h7'))
+    assert h(m) == h(m1)
+
+def test_compare_bags():
+    assert compare.compare_bags([], []) == (0, 0, 0)
+    assert compare.compare_bags([m1], [m1b]) == (0, 1, 0)
+    assert compare.compare_bags([m1, m1c], [m1b]) == (1, 1, 0)
+    assert compare.compare_bags([m1], [m1c, m1f, m1b]) == (0, 1, 2)
+    # each gold MRS is matched at most once
+    assert compare.compare_bags([m1, m1, m1b], [m1, m1b]) == (1, 2, 0)
+    test_unique, shared, gold_unique = compare.compare_bags(
+        [m1c, m1, m1g], [m1f, m1b, m1d, m1e], count_only=False)
+    assert test_unique == [m1c, m1g]
+    assert shared == [m1]
+    assert gold_unique == [m1f, m1d, m1e]
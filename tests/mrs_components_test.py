@@ -486,6 +486,16 @@ class TestPred():
         s.add(spred('_the_q_rel'))
         assert len(s) == 1
 
+    def test_interning(self):
+        assert spred('_dog_n_1_rel') is spred('_dog_n_1_rel')
+        assert spred('_dog_n_1_rel') is not spred('"_dog_n_1_rel"')
+        assert Pred.abstract('pron_rel') is Pred.abstract('pron_rel')
+        assert Pred.surface('pron_rel') is not Pred.abstract('pron_rel')
+        assert (Pred.surface_or_abstract('_dog_n_1_rel')
+                is Pred.surface('_dog_n_1_rel'))
+        assert Pred.realpred('dog', 'n', 1) is Pred.realpred('dog', 'n', '1')
+        assert Pred.realpred('dog', 'n') is not Pred.surface('_dog_n_rel')
+
 
 def test_split_pred_string():
     sps = split_pred_string
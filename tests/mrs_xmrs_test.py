@@ -60,6 +60,17 @@ class TestXmrs():
             x.add_eps([(10000, Pred.surface('_n_n_rel'), 'h3', {})])
         assert len(x.eps()) == 1
 
+        # EPs added before an error keep their variable references
+        with pytest.raises(XmrsError):
+            x.add_eps([(10001, Pred.surface('_n_n_rel'), 'h1', {}),
+                       (10000, Pred.surface('_n_n_rel'), 'h3', {})])
+        assert sorted(x.labelset('h1')) == [10000, 10001]
+        assert x.labelset('h3') == []
+        # many EPs may share a variable
+        x = Xmrs(eps=[(i, Pred.surface('_a_a_rel'), 'h1', {'ARG1': 'x2'})
+                      for i in range(1000)])
+        assert x.labelset('h1') == list(range(1000))
+
     def test_add_hcons(self):
         x = Xmrs()
         with pytest.raises(XmrsError):
@@ -269,7 +280,14 @@ class TestXmrs():
         # and properties can't be added via properties()
         x.properties('x4')['NUM'] = 'sg'
         assert x.properties('x4') == {'PERS': '3'}
+        x.properties('x4', as_list=True).append(('NUM', 'sg'))
+        assert x.properties('x4', as_list=True) == [('PERS', '3')]
         # TODO: how do we add properties?
+        # equal properties are shared among variables and Xmrs objects
+        x = Xmrs(vars={'x1': [('PERS', '3')], 'x2': [('PERS', '3')]})
+        y = Xmrs(vars={'x1': {'PERS': '3'}})
+        assert x._vars['x1'].props is x._vars['x2'].props
+        assert x._vars['x1'].props is y._vars['x1'].props
         # constants are not variables
         x = Xmrs(eps=[(10, sp('_v_v_rel'), 'h3',
                        {'ARG0': 'e2', 'CARG': '"dog"'})])
@@ -484,6 +502,40 @@ class TestXmrs():
     def test_labelset(self): pass
     def test_labelset_heads(self): pass
 
+    def test_derived_cache(self):
+        from delphin.mrs.components import links, nodes
+        sp = Pred.surface
+        x = Xmrs(
+            top='h0',
+            eps=[(10, sp('_v_v_rel'), 'h1', {'ARG0': 'e2', 'ARG1': 'x3'})],
+            hcons=[('h0', 'qeq', 'h1')],
+            vars={'e2': [('TENSE', 'past')]}
+        )
+        assert links(x) == [Link(0, 10, None, 'H')]
+        assert x.labelset_heads('h1') == [10]
+        # returned structures can be modified without affecting later calls
+        links(x).append(None)
+        x.labelset_heads('h1').append(None)
+        x.incoming_args(10)[11] = {'ARG1': 'e2'}
+        nodes(x)[0].sortinfo['TENSE'] = 'pres'
+        assert len(links(x)) == 1
+        assert x.labelset_heads('h1') == [10]
+        assert x.incoming_args(10) == {}
+        assert nodes(x)[0].sortinfo == {'cvarsort': 'e', 'TENSE': 'past'}
+        # adding EPs, HCONS, or ICONS invalidates the cached structures
+        x.add_eps([(11, sp('_n_n_rel'), 'h4', {'ARG0': 'x3'}),
+                   (12, sp('_a_a_rel'), 'h1', {'ARG0': 'e5', 'ARG1': 'e2'})])
+        assert x.labelset_heads('h1') == [10]
+        assert x.incoming_args(11) == {10: {'ARG1': 'x3'}}
+        assert len(nodes(x)) == 3
+        assert links(x) == [
+            Link(0, 10, None, 'H'),
+            Link(10, 11, 'ARG1', 'NEQ'),
+            Link(12, 10, 'ARG1', 'EQ')
+        ]
+        x.top = None
+        assert Link(0, 10, None, 'H') not in links(x)
+
     def test_is_connected(self):
         # empty Xmrs objects cannot be checked for connectedness
         with pytest.raises(XmrsError):
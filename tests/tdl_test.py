@@ -360,6 +360,15 @@ def test_parse_type_features():
     assert isinstance(t['ATTR'], Conjunction)
     assert t['ATTR'].terms == ['val1', 'val2']
 
+    # undocumented identifiers are shared; documented ones are not
+    t = tdlparse('a := b & [ ATTR1 val, ATTR2 val, ATTR3 """doc""" val ].')
+    assert t['ATTR1'] is t['ATTR2']
+    assert t['ATTR1'].docstring is None
+    assert t['ATTR3'] == t['ATTR1']
+    assert t['ATTR3'] is not t['ATTR1']
+    assert t['ATTR3'].docstring == 'doc'
+    assert [f for f, _ in t.features()] == ['ATTR1', 'ATTR2', 'ATTR3']
+
 
 def test_parse_multiple_features():
     t = tdlparse('a := b & [ ATTR1 1, ATTR2 2].')
@@ -571,6 +580,26 @@ def test_parse_blockcomment():
     assert bc == ' this is a comment\n   on multiple lines'
 
 
+def test_parse_comments_in_definitions():
+    events = list(tdl.iterparse(StringIO(
+        '; before\n'
+        'a := b & ; inside\n'
+        '  [ #| inside\n |# ORTH < "a\n b" >,\n'
+        '    PRED "x" ]. ; after\n'
+        'c := d.\n')))
+    assert [(e, lineno) for e, _, lineno in events] == [
+        ('LineComment', 1),
+        ('TypeDefinition', 2),
+        ('LineComment', 6),
+        ('TypeDefinition', 7)]
+    a = events[1][1]
+    assert a['ORTH'].values() == ['a\n b']
+    assert a['PRED'] == 'x'
+    with pytest.raises(TdlParsingError) as excinfo:
+        list(tdl.iterparse(StringIO('a := b.\n\nc := $ d.\n')))
+    assert excinfo.value.line_number == 3
+
+
 def test_parse_environments():
     tdlparse = lambda s: tdl.iterparse(StringIO(s))
     g = tdlparse(':begin :type.\n'
@@ -646,6 +675,193 @@ def test_parse_environments():
     assert isinstance(e2.entries[0], FileInclude)
 
 
+def test_load_grammar(tmpdir):
+    tmpdir.join('top.tdl').write(
+        ':begin :type.\n'
+        '  :include "types".\n'
+        ':end :type.\n'
+        ':begin :instance.\n'
+        '  :include "lex/lexicon.tdl".\n'
+        ':end :instance.\n')
+    tmpdir.join('types.tdl').write('a := *top*.\n')
+    tmpdir.mkdir('lex').join('lexicon.tdl').write(
+        'b := a.\n'
+        ':include "more".\n'
+        ':include "../types".\n'
+        'c := a.\n')
+    tmpdir.join('lex', 'more.tdl').write('d := a.\n')
+    top = str(tmpdir.join('top.tdl'))
+    types = str(tmpdir.join('types.tdl'))
+    lexicon = str(tmpdir.join('lex', 'lexicon.tdl'))
+    more = str(tmpdir.join('lex', 'more.tdl'))
+
+    def summary(events):
+        return [(fn, event, getattr(obj, 'identifier', None), lineno)
+                for fn, event, obj, lineno in events]
+
+    expected = [
+        (top, 'BeginEnvironment', None, 1),
+        (top, 'FileInclude', None, 2),
+        (types, 'TypeDefinition', 'a', 1),
+        (top, 'EndEnvironment', None, 3),
+        (top, 'BeginEnvironment', None, 4),
+        (top, 'FileInclude', None, 5),
+        (lexicon, 'TypeDefinition', 'b', 1),
+        (lexicon, 'FileInclude', None, 2),
+        (more, 'TypeDefinition', 'd', 1),
+        (lexicon, 'FileInclude', None, 3),  # types.tdl already loaded
+        (lexicon, 'TypeDefinition', 'c', 4),
+        (top, 'EndEnvironment', None, 6),
+    ]
+    assert summary(tdl.load_grammar(top, jobs=1)) == expected
+    assert summary(tdl.load_grammar(top, jobs=2)) == expected
+    assert summary(tdl.load_grammar([types, more], jobs=2)) == [
+        (types, 'TypeDefinition', 'a', 1),
+        (more, 'TypeDefinition', 'd', 1),
+    ]
+
+    tmpdir.join('lex', 'more.tdl').write('d := a\n')
+    with pytest.raises(TdlParsingError) as excinfo:
+        list(tdl.load_grammar(top, jobs=2))
+    assert excinfo.value.filename == more
+
+
+def test_load_grammar_cache(tmpdir, monkeypatch):
+    cache = tmpdir.join('cache')
+    tmpdir.join('a.tdl').write('a := *top*.\n:include "b".\n')
+    tmpdir.join('b.tdl').write('b := a & [ F < "x" > ].\n')
+    top = str(tmpdir.join('a.tdl'))
+
+    def load():
+        return [(fn, event, tdl.format(obj), lineno)
+                for fn, event, obj, lineno
+                in tdl.load_grammar(top, jobs=1, cache=str(cache))
+                if event == 'TypeDefinition']
+
+    expected = load()
+    assert len(cache.listdir()) == 2
+    # unchanged files are not parsed again
+    monkeypatch.setattr(tdl, '_parse2', None)
+    assert load() == expected
+    monkeypatch.undo()
+    # changed files are
+    tmpdir.join('b.tdl').write('b := a.\n')
+    assert load() == expected[:1] + [(str(tmpdir.join('b.tdl')),
+                                      'TypeDefinition', 'b := a.', 1)]
+    assert len(cache.listdir()) == 3
+    # a new cache format does not load the old pickles
+    monkeypatch.setattr(tdl, '_CACHE_FORMAT', tdl._CACHE_FORMAT + 1)
+    expected = load()
+    assert len(cache.listdir()) == 5
+    # unreadable pickles are parsed again and replaced
+    for path in cache.listdir():
+        path.write_binary(b'')
+    assert load() == expected
+    monkeypatch.setattr(tdl, '_parse2', None)
+    assert load() == expected
+
+
+
+def test_load_grammar_cache_write_failure(tmpdir, monkeypatch):
+    cache = tmpdir.join('cache')
+    cache.ensure(dir=True)
+    tmpdir.join('a.tdl').write('a := *top*.\n')
+    top = str(tmpdir.join('a.tdl'))
+
+    def load():
+        return [obj.identifier for _, event, obj, _
+                in tdl.load_grammar(top, jobs=1, cache=str(cache))
+                if event == 'TypeDefinition']
+
+    # an unwritable cache directory only means the file is parsed
+    def unwritable(*args, **kwargs):
+        raise OSError(13, 'Permission denied')
+    monkeypatch.setattr(tdl.tempfile, 'mkstemp', unwritable)
+    assert load() == ['a']
+    assert cache.listdir() == []
+    monkeypatch.undo()
+    # as do objects that cannot be pickled, with no temporary file left
+    def unpicklable(*args, **kwargs):
+        raise TypeError('cannot pickle')
+    monkeypatch.setattr(tdl.pickle, 'dump', unpicklable)
+    assert load() == ['a']
+    assert cache.listdir() == []
+
+
+def test_Index(tmpdir):
+    f = tmpdir.join('lexicon.tdl')
+    f.write_text(
+        '; comment\n'
+        'a := *top*. b := a & """doc""" [ F < "\u00e9" #| c := x. |# > ].\n'
+        '#| block\n'
+        'd := e. |#\n'
+        'a :+ [ G h ].\n'
+        ':begin :instance.\n'
+        'e := b &\n'
+        '  [ H.I "j" ].\n'
+        ':end :instance.\n',
+        encoding='utf-8')
+    index = tdl.Index(str(f))
+    assert len(index) == 3
+    assert list(index) == ['a', 'b', 'e']
+    assert 'd' not in index
+    assert isinstance(index['a'], TypeDefinition)
+    assert not isinstance(index['a'], TypeAddendum)
+    assert index['b'].documentation() == 'doc'
+    assert index['b']['F.FIRST'] == '\u00e9'
+    assert index['e']['H.I'] == 'j'
+    assert index.line_number('e') == 7
+    assert index.get('d') is None
+    with pytest.raises(KeyError):
+        index['d']
+
+    f.write_text('a := b & [ F ].\n', encoding='utf-8')
+    index = tdl.Index(str(f))
+    with pytest.raises(TdlParsingError) as excinfo:
+        index['a']
+    assert excinfo.value.filename == str(f)
+
+
+def test_FeatureIndex(tmpdir):
+    f = tmpdir.join('lexicon.tdl')
+    f.write_text(
+        'dog_n1 := n_le & [ ORTH < "dog" >, PRED "_dog_n_1_rel",\n'
+        '                   HEAD Noun ].\n'
+        'dot_n1 := n_le & [ ORTH < "dot" >, PRED "_dot_n_1_rel",\n'
+        '                   HEAD #h, ARG #h ].\n'
+        'dog_v1 := v_le & [ ORTH < "dog" >, PRED "_dog_v_1_rel" ].\n'
+        'dog_n1 :+ [ GEN neut ].\n',
+        encoding='utf-8')
+    index = tdl.FeatureIndex(tdl.iterparse(str(f)))
+    assert len(index) == 3
+    assert 'pred' in index
+    assert 'SYNSEM' not in index
+    assert index.paths() == ['ARG', 'GEN', 'HEAD', 'ORTH.FIRST', 'PRED']
+    assert index.values('orth.first') == ['dog', 'dot']
+    assert index.lookup('ORTH.FIRST', 'dog') == ['dog_n1', 'dog_v1']
+    assert index.lookup('HEAD', 'noun') == ['dog_n1']
+    assert index.lookup('HEAD', '#h') == ['dot_n1']
+    assert index.lookup('GEN', 'neut') == ['dog_n1']
+    assert index.lookup('PRED', '_dog') == []
+    assert index.lookup('SYNSEM', 'dog') == []
+    assert index.prefix('PRED', '_do') == ['dog_n1', 'dot_n1', 'dog_v1']
+    assert index.prefix('PRED', '_dog_') == ['dog_n1', 'dog_v1']
+    assert index.prefix('PRED', '_x') == []
+    assert index.search('PRED', '_n_') == ['dog_n1', 'dot_n1']
+    assert index.search('PRED', r'^_dog_.*_rel$') == ['dog_n1', 'dog_v1']
+
+    idx = tmpdir.join('lexicon.fidx')
+    index.write(str(idx))
+    index = tdl.FeatureIndex.from_file(str(idx))
+    assert len(index) == 3
+    assert index.lookup('ORTH.FIRST', 'dog') == ['dog_n1', 'dog_v1']
+    assert index.search('PRED', '_n_') == ['dog_n1', 'dot_n1']
+
+    index = tdl.FeatureIndex(obj for _, obj, _ in tdl.iterparse(str(f)))
+    assert index.lookup('GEN', 'neut') == ['dog_n1']
+    assert len(tdl.FeatureIndex()) == 0
+
+
 def test_format_TypeTerms():
     assert tdl.format(TypeIdentifier('a-type')) == 'a-type'
     assert tdl.format(String('a string')) == '"a string"'
@@ -31,6 +31,14 @@ def test_FeatureStructure():
     with pytest.raises(KeyError):
         fs['A.B.E']
 
+def test_FeatureStructure_feature_names(monkeypatch):
+    monkeypatch.setattr(tfs, '_feature_names', {})
+    monkeypatch.setattr(tfs, '_feature_names_limit', 4)
+    fs = tfs.FeatureStructure([('a', 1), ('b', 2), ('c', 3)])
+    assert len(tfs._feature_names) <= 4
+    assert fs['a'] == 1 and fs['B'] == 2 and fs['c'] == 3
+    assert fs.features() == [('A', 1), ('B', 2), ('C', 3)]
+
 def test_TypedFeatureStructure():
     with pytest.raises(TypeError):
         tfs.TypedFeatureStructure()
@@ -73,6 +81,14 @@ def test_TypeHierarchy():
     assert th.subsumes('c', 'a') is False
     assert th.subsumes('c', 'b') is False
     assert th.compatible('a', 'b') is True
+    assert sorted(th.ancestors('c')) == ['*top*', 'a', 'b']
+    assert sorted(th.descendants('*top*')) == ['a', 'b', 'c']
+    assert th.descendants('c') == []
+    # compiled bit vectors are rebuilt after the hierarchy changes
+    th['d'] = ['c']
+    assert th.subsumes('a', 'd') is True
+    assert th.compatible('b', 'd') is True
+    assert sorted(th.descendants('a')) == ['c', 'd']
 
     # trivial cycle
     with pytest.raises(ValueError):
@@ -107,3 +123,93 @@ def test_TypeHierarchy():
     #                                 'a2': ['a'],
     #                                 'b2': ['b'],
     #                                 'd': ['a2', 'b2']})
+
+
+def test_TypeHierarchy_glb():
+    th = tfs.TypeHierarchy('*top*', {'a': ['*top*'],
+                                     'b': ['*top*'],
+                                     'c': ['a', 'b'],
+                                     'd': ['*top*']})
+    assert th.glb('a', 'a') == 'a'
+    assert th.glb('*top*', 'a') == 'a'
+    assert th.glb('a', 'b') == 'c'
+    assert th.glb('c', 'b') == 'c'
+    assert th.glb('a', 'd') is None
+    th['e'] = ['a', 'b']
+    with pytest.raises(ValueError):
+        th.glb('a', 'b')
+    assert th.glb('c', 'e') is None
+
+
+def test_TypeHierarchy_glb_closure():
+    th = tfs.TypeHierarchy('*top*', {'a': ['*top*'],
+                                     'b': ['*top*'],
+                                     'c': ['a', 'b'],
+                                     'd': ['a', 'b']})
+    assert th.glb_closure() == ['glbtype1']
+    assert th.glb('a', 'b') == 'glbtype1'
+    assert sorted(th.descendants('glbtype1')) == ['c', 'd']
+    assert sorted(th.ancestors('c')) == ['*top*', 'a', 'b', 'glbtype1']
+    assert th.glb_closure() == []
+
+    # non-symmetric non-unique glb
+    th = tfs.TypeHierarchy('*top*', {'a': ['*top*'],
+                                     'b': ['*top*'],
+                                     'c': ['*top*'],
+                                     'd': ['a', 'b', 'c'],
+                                     'e': ['a', 'b']})
+    assert th.glb_closure(prefix='g') == ['g1']
+    assert th.glb('a', 'b') == 'g1'
+    assert th.glb('a', 'c') == 'd'
+    assert th.subsumes('g1', 'd') and th.subsumes('g1', 'e')
+
+    # non-immediate non-unique glb
+    th = tfs.TypeHierarchy('*top*', {'a': ['*top*'],
+                                     'b': ['*top*'],
+                                     'c': ['a', 'b'],
+                                     'a2': ['a'],
+                                     'b2': ['b'],
+                                     'd': ['a2', 'b2']})
+    assert th.glb_closure() == ['glbtype1']
+    assert th.glb('a', 'b') == 'glbtype1'
+    assert th.glb('a2', 'b2') == 'd'
+
+    # glbs of glbs
+    th = tfs.TypeHierarchy('*top*', {'a': ['*top*'],
+                                     'b': ['*top*'],
+                                     'c': ['*top*'],
+                                     'd': ['a', 'b', 'c'],
+                                     'e': ['a', 'b', 'c'],
+                                     'f': ['a', 'b'],
+                                     'g': ['b', 'c']})
+    added = th.glb_closure()
+    assert len(added) == 3
+    for x, y in [('a', 'b'), ('b', 'c'), ('a', 'c')]:
+        assert th.glb(x, y) in added
+    assert th.subsumes(th.glb('a', 'b'), th.glb('a', 'c'))
+
+
+def test_TypeHierarchy_from_tdl(tmpdir):
+    types = tmpdir.join('types.tdl')
+    types.write(
+        'a := *top*.\n'
+        'B := *top* & [ F "x" ].\n'
+        'c := a & b & "str".\n'
+        ':begin :instance.\n'
+        'inst := c.\n'
+        ':end :instance.\n')
+    more = tmpdir.join('more.tdl')
+    more.write(
+        ':begin :type.\n'
+        'd := *top*.\n'
+        'e := a.\n'
+        'e :+ d & [ G h ].\n'
+        ':end :type.\n')
+    th = tfs.TypeHierarchy.from_tdl([str(types), str(more)])
+    assert sorted(th.descendants('*top*')) == ['a', 'b', 'c', 'd', 'e']
+    assert sorted(th.ancestors('c')) == ['*top*', 'a', 'b']
+    assert sorted(th.ancestors('e')) == ['*top*', 'a', 'd']
+    with pytest.raises(ValueError):
+        tfs.TypeHierarchy.from_tdl(str(more))  # a is undefined
+    with pytest.raises(ValueError):
+        tfs.TypeHierarchy.from_tdl([str(types), str(types)])
@@ -5,7 +5,7 @@ import pytest
 
 from delphin import tsql
 from delphin import itsdb
-from delphin.exceptions import TSQLSyntaxError
+from delphin.exceptions import TSQLError, TSQLSyntaxError
 
 from .commands_test import mini_testsuite as ts0
 
@@ -20,6 +20,49 @@ def test_parse_query():
         parse('insert into item i-id values 10')
 
 
+def test_parse_update():
+    parse = lambda s: tsql._parse_query(s)
+    with pytest.raises(TSQLSyntaxError):
+        parse('update item')
+    with pytest.raises(TSQLSyntaxError):
+        parse('update item set i-wf')
+    with pytest.raises(TSQLSyntaxError):
+        parse('update item set i-wf < 2')
+    with pytest.raises(TSQLSyntaxError):
+        parse('update item set i-wf = i-id')
+
+    assert parse('update item set i-wf = 0') == {
+        'querytype': 'update',
+        'table': 'item',
+        'assignments': [('i-wf', 0)],
+        'where': None}
+
+    assert parse('update item set i-wf = 0 i-input = "a \\"b\\""'
+                 ' where i-id = 10') == {
+        'querytype': 'update',
+        'table': 'item',
+        'assignments': [('i-wf', 0), ('i-input', 'a "b"')],
+        'where': ('==', ('i-id', 10))}
+
+
+def test_parse_delete():
+    parse = lambda s: tsql._parse_query(s)
+    with pytest.raises(TSQLSyntaxError):
+        parse('delete item')
+    with pytest.raises(TSQLSyntaxError):
+        parse('delete from')
+
+    assert parse('delete from item') == {
+        'querytype': 'delete',
+        'table': 'item',
+        'where': None}
+
+    assert parse('delete from result where i-id = 10 or i-id = 20') == {
+        'querytype': 'delete',
+        'table': 'result',
+        'where': ('or', (('==', ('i-id', 10)), ('==', ('i-id', 20))))}
+
+
 def test_parse_select():
     parse = lambda s: tsql._parse_select(s)
     with pytest.raises(TSQLSyntaxError):
@@ -149,3 +192,124 @@ def test_select_where(ts0):
         ['It rained.'], ['Rained.'], ['It snowed.']]
     assert list(tsql.select('i-input where readings > 0', ts)) == [
         ['It rained.'], ['It snowed.']]
+
+
+def test_explain(ts0):
+    ts = itsdb.TestSuite(str(ts0))
+    stages = tsql.explain('select i-id where readings > 0', ts)
+    assert [(s['clause'], s['operation'], s['table']) for s in stages] == [
+        ('projection', 'scan', 'item'),
+        ('where', 'scan', 'parse'),
+        ('where', 'join', 'parse'),
+        ('where', 'filter', 'item'),
+        ('select', 'select', 'item')]
+    assert [(s['rows_in'], s['rows_out']) for s in stages] == [
+        (3, 3), (3, 3), (3, 3), (3, 2), (2, 2)]
+    assert stages[2]['on'] == 'i-id'
+    assert stages[2]['how'] == 'left'
+    assert all(s['time'] >= 0 for s in stages)
+    stages = tsql.explain('select i-input from item result', ts)
+    assert [(s['operation'], s['table']) for s in stages] == [
+        ('scan', 'item'),
+        ('scan', 'parse'),
+        ('join', 'parse'),
+        ('scan', 'result'),
+        ('join', 'result'),
+        ('select', 'item+parse+result')]
+    assert stages[-1]['rows_out'] == 2
+    with pytest.raises(TSQLSyntaxError):
+        tsql.explain('i-id', ts)
+
+
+def test_select_indexed(ts0):
+    ts = itsdb.TestSuite(str(ts0))
+    queries = ['i-input where readings > 0',
+               'i-input where readings < 1',
+               'i-id readings where readings >= 1 and i-id != 30',
+               'i-input where i-id = 20 or readings = 1',
+               'i-id where parse:i-id <= 20 where readings = 0',
+               'i-id where i-date > 2018-01-01',
+               'parse-id where readings = 1']
+    expected = [list(tsql.select(q, ts)) for q in queries]
+    ts.create_index('parse', 'readings')
+    ts.create_index('parse', 'i-id')
+    ts.create_index('item', 'i-date')
+    assert [list(tsql.select(q, ts)) for q in queries] == expected
+    stages = tsql.explain('select i-id where readings > 0', ts)
+    assert [(s['operation'], s['table']) for s in stages][:3] == [
+        ('scan', 'item'), ('index', 'parse'), ('join', 'parse')]
+    assert (stages[1]['rows_in'], stages[1]['rows_out']) == (3, 2)
+    assert stages[1]['on'] == ('readings',)
+    # the default value (-1) of rows missing a parse would satisfy the
+    # condition, so the left join cannot use the index
+    stages = tsql.explain('select i-id where readings < 1', ts)
+    assert stages[1]['operation'] == 'scan'
+    # inner joins may use the index because parse's keys are unique
+    stages = tsql.explain('select i-id readings where readings < 1', ts)
+    assert [s['operation'] for s in stages][:2] == ['scan', 'index']
+    # changes to the table make the index out of date
+    ts0.join('parse').write('40@40@1\n', mode='a')
+    ts.reload()
+    assert tsql.explain('select i-id where readings > 0', ts)[1][
+        'operation'] == 'scan'
+    assert list(tsql.select('i-id where readings > 0', ts)) == [[10], [30]]
+    # unsaved changes to the table in memory also make it out of date
+    ts.create_index('item', 'i-wf')
+    assert list(tsql.select('i-id where i-wf = 1', ts)) == [[10], [30]]
+    ts['item'][1]['i-wf'] = 1
+    assert ts['item'].modified
+    assert list(tsql.select('i-id where i-wf = 1', ts)) == [
+        [10], [20], [30]]
+    ts.write('item')
+    assert not ts['item'].modified
+    assert tsql.explain('select i-id where i-wf = 1', ts)[0][
+        'operation'] == 'index'
+
+
+def test_select_collection(ts0, tmpdir):
+    ts0.copy(tmpdir.join('ts1'))
+    pc = itsdb.ProfileCollection(str(tmpdir.join('ts*')))
+    p0, p1 = str(ts0), str(tmpdir.join('ts1'))
+    for jobs in (1, 2):
+        assert list(tsql.select('i-id where readings > 0', pc,
+                                jobs=jobs)) == [
+            [p0, 10], [p0, 30], [p1, 10], [p1, 30]]
+    assert list(tsql.select('i-id i-input where i-id = 20', pc,
+                            mode='row')) == [
+        p0 + '@20@Rained.', p1 + '@20@Rained.']
+    assert list(tsql.select('i-id where i-id = 20', pc, mode='dict')) == [
+        {'profile': p0, 'i-id': 20}, {'profile': p1, 'i-id': 20}]
+    assert list(tsql.query('select i-id where i-id = 20', pc, jobs=1)) == [
+        [p0, 20], [p1, 20]]
+
+
+def test_update(ts0):
+    ts = itsdb.TestSuite(str(ts0))
+    assert tsql.query('update item set i-wf = 2 where i-id = 20', ts) == 1
+    assert ts0.join('item').read().splitlines()[1] == (
+        '20@Rained.@2@01-02-18 15:00:00')
+    assert list(tsql.select('i-id i-wf', ts)) == [[10, 1], [20, 2], [30, 1]]
+    # conditions on joined tables
+    assert tsql.query('update parse set readings = 2 '
+                      'where i-input ~ "It"', ts) == 2
+    assert list(tsql.select('i-id readings', ts)) == [
+        [10, 2], [20, 0], [30, 2]]
+    assert tsql.query('update item set i-input = "x" where i-id > 30', ts) == 0
+    with pytest.raises(TSQLError):
+        tsql.query('update item set readings = 1', ts)
+    with pytest.raises(TSQLError):
+        tsql.query('update item set parse:i-id = 1', ts)
+    # other tables are not rewritten
+    assert ts0.join('result').read().startswith('10@0@[ TOP: h0')
+
+
+def test_delete(ts0):
+    ts = itsdb.TestSuite(str(ts0))
+    assert tsql.query('delete from result where item:i-input ~ "snow"',
+                      ts) == 1
+    assert list(tsql.select('parse-id from result', ts)) == [[10]]
+    assert tsql.query('delete from item where i-id >= 20', ts) == 2
+    assert ts0.join('item').read() == '10@It rained.@1@1-feb-2018 15:00\n'
+    assert tsql.query('delete from parse', ts) == 3
+    assert ts0.join('parse').read() == ''
+    assert len(ts['parse']) == 0
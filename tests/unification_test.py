@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+from io import StringIO
+
+import pytest
+
+from delphin import tdl
+from delphin.tfs import (
+    FeatureStructure,
+    TypedFeatureStructure,
+    TypeHierarchy
+)
+from delphin.unification import Graph, Unifier, unify
+from delphin.exceptions import UnificationError
+
+
+@pytest.fixture
+def hierarchy():
+    return TypeHierarchy('*top*', {
+        'string': ['*top*'],
+        '*list*': ['*top*'],
+        '*cons*': ['*list*'],
+        '*null*': ['*list*'],
+        'head': ['*top*'],
+        'noun': ['head'],
+        'verb': ['head'],
+        'a': ['*top*'],
+        'b': ['*top*'],
+        'c': ['a', 'b'],
+    })
+
+
+def definitions(s):
+    return dict((obj.identifier, obj)
+                for event, obj, _ in tdl.iterparse(StringIO(s))
+                if event == 'TypeDefinition')
+
+
+def test_unify_feature_structures():
+    fs = unify(FeatureStructure([('A', 'x')]),
+               FeatureStructure([('B.C', 'y')]))
+    assert isinstance(fs, TypedFeatureStructure)
+    assert fs.type is None
+    assert fs['A'] == 'x'
+    assert fs['B.C'] == 'y'
+    assert unify(FeatureStructure([('A', 'x')]),
+                 FeatureStructure([('A', 'y')])) is None
+    # without a hierarchy, only identical types unify
+    assert unify(TypedFeatureStructure('a'),
+                 TypedFeatureStructure('a')).type == 'a'
+    assert unify(TypedFeatureStructure('a'),
+                 TypedFeatureStructure('b')) is None
+
+
+def test_unify_types(hierarchy):
+    fs = unify(TypedFeatureStructure('a', [('F', 'a')]),
+               TypedFeatureStructure('b', [('F', 'b'), ('G', 'a')]),
+               hierarchy=hierarchy)
+    assert fs.type == 'c'
+    assert fs['F'] == 'c'
+    assert fs['G'] == 'a'
+    assert unify(TypedFeatureStructure('noun'),
+                 TypedFeatureStructure('verb'),
+                 hierarchy=hierarchy) is None
+    # unknown types are errors, not failures
+    with pytest.raises(UnificationError) as excinfo:
+        unify(TypedFeatureStructure('a'), TypedFeatureStructure('zzz'),
+              hierarchy=hierarchy)
+    assert 'zzz' in str(excinfo.value)
+    with pytest.raises(UnificationError) as excinfo:
+        unify(TypedFeatureStructure('yyy'), TypedFeatureStructure('a'),
+              hierarchy=hierarchy)
+    assert 'yyy' in str(excinfo.value)
+    with pytest.raises(UnificationError):
+        unify(TypedFeatureStructure('yyy'), TypedFeatureStructure(
+            tdl.String('x')), hierarchy=hierarchy)
+    # identical types need no hierarchy
+    assert unify(TypedFeatureStructure('zzz'), TypedFeatureStructure('zzz'),
+                 hierarchy=hierarchy).type == 'zzz'
+    hierarchy['d'] = ['a', 'b']
+    with pytest.raises(ValueError):
+        unify(TypedFeatureStructure('a'), TypedFeatureStructure('b'),
+              hierarchy=hierarchy)
+
+
+def test_unify_reentrancy():
+    shared = FeatureStructure([('F', 'x')])
+    fs1 = FeatureStructure([('A', shared), ('B', shared)])
+    fs = unify(fs1, FeatureStructure([('A.G', 'y')]))
+    assert fs['B.G'] == 'y'
+    assert fs['A'] is fs['B']
+    assert unify(fs1, FeatureStructure([('B.F', 'z')])) is None
+    # inputs are not modified
+    assert 'G' not in shared
+
+
+def test_unify_tdl(hierarchy):
+    defs = definitions(
+        'rule := *top* & [ HEAD #head, ARGS < [ HEAD #head & noun ] > ].\n'
+        'dog := *top* & [ HEAD noun, ORTH "dog" ].\n'
+        'run := *top* & [ HEAD verb, ORTH "run" ].\n'
+        'twice := *top* & [ F #x, G #x & "a", H #x & string ].\n'
+        'bad := *top* & [ F #x & "a", G #x & "b" ].\n'
+        'dl := *top* & [ L <! a !> ].\n')
+    unifier = Unifier(hierarchy)
+    rule = unifier.compile(defs['rule'])
+    assert isinstance(rule, Graph)
+    result = unifier.unify(rule, defs['dog'], path='ARGS.FIRST')
+    assert isinstance(result, Graph)
+    fs = result.to_fs()
+    assert fs['HEAD'].type == 'noun'  # shared, so not just a type
+    assert fs['ARGS.FIRST.ORTH'] == 'dog'
+    assert fs['ARGS.REST'] == '*null*'
+    # failures leave no trace on the compiled rule
+    assert unifier.unify(rule, defs['run'], path='ARGS.FIRST') is None
+    fs = unifier.unify(rule, defs['dog'], path='ARGS.FIRST').to_fs()
+    assert fs['ARGS.FIRST.ORTH'] == 'dog'
+    assert fs['HEAD'] is fs['ARGS.FIRST.HEAD']
+
+    fs = unifier.compile(defs['twice']).to_fs()
+    assert fs['F'] is fs['G'] is fs['H']
+    assert fs['F'].type == 'a'
+    assert isinstance(fs['F'].type, tdl.String)
+    with pytest.raises(UnificationError):
+        unifier.compile(defs['bad'])
+    fs = unifier.compile(defs['dl']).to_fs()
+    assert fs['L.LIST.FIRST'] == 'a'
+    assert fs['L.LIST.REST'] is fs['L.LAST']
+
+
+def test_unify_cycles():
+    unifier = Unifier()
+    cyclic = FeatureStructure()
+    cyclic['A'] = cyclic
+    g = unifier.compile(cyclic)
+    fs = unifier.unify(g, FeatureStructure([('B', 'x')])).to_fs()
+    assert fs['A'] is fs
+    assert fs['A.A.B'] == 'x'